@@ -0,0 +1,74 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from mapek.Aggregator import Aggregator
+
+# run from the repository root: python -m benchmarks.aggregate
+
+
+def _pandas_aggregate(data_dict, service_to_use):
+    # the per-metric DataFrame path used before the Aggregator
+
+    outputs = {svc: {} for svc in service_to_use}
+    for key, res in data_dict.items():
+        df = pd.DataFrame([{
+            "timestamp": e['t'], "service": e['d'][0], "value": e['d'][1]
+        } for e in res["data"]])
+        df_filtered = df[df['service'].isin(service_to_use)]
+        avg_values = df_filtered.groupby('service')['value'].mean()
+        for svc, val in avg_values.items():
+            outputs[svc][key] = val
+    return outputs
+
+
+def benchmark(n_services=300, n_samples=3000, n_metrics=17, repeat=3):
+    rng = np.random.default_rng(0)
+    services = [f"service-{i}" for i in range(n_services)]
+    # a few foreign deployments that have to be filtered out
+    names = services + [f"other-{i}" for i in range(n_services // 10)]
+    data_dict = {}
+    for m in range(n_metrics):
+        picks = rng.integers(0, len(names), n_samples)
+        values = rng.random(n_samples) * 100
+        data_dict[(f"metric.{m}", "avg")] = {
+            "data": [{"t": t, "d": [names[p], float(v)]} for t, (p, v) in enumerate(zip(picks, values))]
+        }
+
+    aggregator = Aggregator(services)
+    timings = {}
+    for name, func in (("pandas", lambda: _pandas_aggregate(data_dict, services)),
+                       ("numpy", lambda: aggregator.aggregate(data_dict))):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = (best, result)
+
+    # both paths have to agree before the timing means anything
+    expected, actual = timings["pandas"][1], timings["numpy"][1]
+    for svc in services:
+        for key, value in expected[svc].items():
+            assert abs(actual[svc][key] - value) < 1e-9, (svc, key)
+
+    print(f"{n_metrics} metrics x {n_samples} samples, {n_services} services")
+    print(f"pandas: {timings['pandas'][0] * 1000:.2f} ms")
+    print(f"numpy:  {timings['numpy'][0] * 1000:.2f} ms")
+    print(f"speedup: {timings['pandas'][0] / timings['numpy'][0]:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Aggregator with the pandas path it replaced")
+    parser.add_argument("--services", type=int, default=300)
+    parser.add_argument("--samples", type=int, default=3000)
+    parser.add_argument("--metrics", type=int, default=17)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.services, args.samples, args.metrics, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,72 @@
 import os
+import sys
 import json
 import time
 import csv
+import signal
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
 
 from mapek.Knowledge import Knowledge
 from mapek.Monitor import Monitor
-from mapek.Analyzer import Analyzer
-from mapek.Planner import Planner
-from mapek.Executor import Executor
-from utils import init_csv, append_to_csv
+from mapek.Tenant import Tenant
+from mapek.Archive import RawArchive
+from mapek.Scheduler import Scheduler, AdaptivePeriod
+from mapek.Instrumentation import Instrumentation, instrument_components
+from utils import DatasetWriter
+
+# Target service
+SERVICE_TO_USE = [
+    "acmeair-mainservice",
+    "acmeair-authservice",
+    "acmeair-flightservice",
+    "acmeair-customerservice",
+    "acmeair-bookingservice"
+]
+
+# Metrics settings
+MONITOR_METRICS = [
+    # avg
+    ("jvm.heap.used.percent", "avg"),
+    ("jvm.gc.global.time", "avg"),
+    ("jvm.nonHeap.used.percent", "avg"),
+    ("cpu.quota.used.percent", "avg"),
+    ("memory.limit.used.percent", "avg"),
+    ("net.request.time.in", "avg"),
+    # max
+    ("jvm.thread.count", "max"),
+    ("net.http.request.time", "max"),
+    ("net.request.time.in", "max"),
+    ("net.bytes.in", "max"),
+    ("net.bytes.out", "max"),
+    ("net.bytes.total", "max"),
+    ("kubernetes.deployment.replicas.available", "max"),
+    # sum
+    ("jvm.gc.global.count", "sum"),
+    ("net.request.count.in", "sum"),
+    ("net.http.error.count", "sum"),
+    ("net.bytes.total", "sum"),
+]
+
+ANALYZE_METRICS = [
+    # Four Golden Signals
+    # Latency
+    ("net.request.time.in", "avg"),
+    ("net.request.time.in", "max"),
+    # Traffic
+    ("net.request.count.in", "sum"),
+    ("net.bytes.total", "sum"),
+    # Errors
+    ("net.http.error.count", "sum"),
+    # Saturation
+    ("cpu.quota.used.percent", "avg"),
+    ("memory.limit.used.percent", "avg"),
+    # Other
+    ("jvm.gc.global.time", "avg"),
+    ("kubernetes.deployment.replicas.available", "max"),
+]
 
 def main():
     # Create a CSV file for the dataset
@@ -27,134 +82,148 @@ def main():
     apikey = os.getenv("APIKEY")
     url = os.getenv("URL")
     sleep = int(os.getenv("SLEEP"))
+    monitor_workers = int(os.getenv("MONITOR_WORKERS", 4))
+    monitor_mode = os.getenv("MONITOR_MODE", "concurrent")
+    monitor_batch_size = int(os.getenv("MONITOR_BATCH_SIZE", 20))
+    dataset_flush_interval = int(os.getenv("DATASET_FLUSH_INTERVAL", 300))
+    dataset_binary = os.getenv("DATASET_BINARY", "false").lower() == "true"
+    executor_parallel = os.getenv("EXECUTOR_PARALLEL", "false").lower() == "true"
+    executor_backend = os.getenv("EXECUTOR_BACKEND", "shell")
+    namespace = os.getenv("NAMESPACE", "acmeair-group6")
+    # comma separated, several tenants managed by this process
+    namespaces = [ns.strip() for ns in (os.getenv("NAMESPACES") or namespace).split(",") if ns.strip()]
+    metrics_port = int(os.getenv("METRICS_PORT", 0))
+    knowledge_poll_interval = int(os.getenv("KNOWLEDGE_POLL_INTERVAL", 5))
+
+    service_to_use = SERVICE_TO_USE
+    monitor_metrics = MONITOR_METRICS
+    analyze_metrics = ANALYZE_METRICS
+
+    if len(namespaces) > 1 and executor_backend != "kubernetes":
+        # config.sh edits one shared set of manifests, tenants could overwrite each other
+        print("Several namespaces need the Kubernetes backend, using EXECUTOR_BACKEND=kubernetes")
+        executor_backend = "kubernetes"
 
-    # Target service
-    service_to_use = [
-        "acmeair-mainservice",
-        "acmeair-authservice",
-        "acmeair-flightservice",
-        "acmeair-customerservice",
-        "acmeair-bookingservice"
-    ]
-
-    current_configs = {svc: {"cpu": 500, "memory": 512, "replica": 1} for svc in service_to_use}
-
-    # Metrics settings
-    monitor_metrics = [
-        # avg
-        ("jvm.heap.used.percent", "avg"),
-        ("jvm.gc.global.time", "avg"),
-        ("jvm.nonHeap.used.percent", "avg"),
-        ("cpu.quota.used.percent", "avg"),
-        ("memory.limit.used.percent", "avg"),
-        ("net.request.time.in", "avg"),
-        # max
-        ("jvm.thread.count", "max"),
-        ("net.http.request.time", "max"),
-        ("net.request.time.in", "max"),
-        ("net.bytes.in", "max"),
-        ("net.bytes.out", "max"),
-        ("net.bytes.total", "max"),
-        ("kubernetes.deployment.replicas.available", "max"),
-        # sum
-        ("jvm.gc.global.count", "sum"),
-        ("net.request.count.in", "sum"),
-        ("net.http.error.count", "sum"),
-        ("net.bytes.total", "sum"),
-    ]
-
-    analyze_metrics = [
-        # Four Golden Signals
-        # Latency
-        ("net.request.time.in", "avg"),
-        ("net.request.time.in", "max"),
-        # Traffic
-        ("net.request.count.in", "sum"),
-        ("net.bytes.total", "sum"),
-        # Errors
-        ("net.http.error.count", "sum"),
-        # Saturation
-        ("cpu.quota.used.percent", "avg"),
-        ("memory.limit.used.percent", "avg"),
-        # Other
-        ("jvm.gc.global.time", "avg"),
-    ]
-
-    # Initialize CSV file
-    init_csv(csv_file)
-    
     # Initialize components
     knowledge = Knowledge("./mapek/knowledge.json")
-    resources = knowledge.get_resources()
-    current_configs = {
-            svc: {
-                "requests": {
-                    "cpu": resources[svc]["requests"]["cpu"],
-                    "memory": resources[svc]["requests"]["memory"]
-                },
-                "limits": {
-                    "cpu": resources[svc]["limits"]["cpu"],
-                    "memory": resources[svc]["limits"]["memory"]
-                },
-                "replica": resources[svc]["replica"]
-            }
-            for svc in service_to_use
-    }
-
-    monitor = Monitor(url, apikey, guid, sleep)
-    analyzer = Analyzer(analyze_metrics, service_to_use, knowledge.get_threshold(), knowledge.get_weight())
-    planner = Planner(service_to_use, knowledge.get_resource_limitations(), knowledge.get_resource_limitations(), knowledge.get_threshold()["roi"])
-    executor = Executor()
+    archive = RawArchive("datasets/archive").start()
+    # one Monitor for every tenant, the queries cover all namespaces at once
+    monitor = Monitor(url, apikey, guid, sleep, monitor_workers, monitor_mode, monitor_batch_size, archive, namespaces)
+
+    # stage timings, exported on METRICS_PORT and logged per cycle
+    instrumentation = Instrumentation("datasets/driver_metrics.jsonl")
+
+    tenants = []
+    for ns in namespaces:
+        if len(namespaces) == 1:
+            # a single tenant keeps the original file layout
+            data_dir, tenant_csv, tenant_knowledge = "datasets", csv_file, knowledge
+        else:
+            data_dir = f"datasets/{ns}"
+            os.makedirs(data_dir, exist_ok=True)
+            tenant_csv = f"{data_dir}/metrics_dataset.csv"
+            # a namespace may bring its own knowledge file, otherwise the shared one is used
+            knowledge_file = f"./mapek/knowledge.{ns}.json"
+            tenant_knowledge = Knowledge(knowledge_file) if os.path.exists(knowledge_file) else knowledge
+        # Open the CSV dataset, appending to the rows of previous runs
+        dataset = DatasetWriter(tenant_csv, service_to_use, dataset_flush_interval, dataset_binary)
+        tenant = Tenant(ns, tenant_knowledge, service_to_use, analyze_metrics, dataset, executor_parallel,
+                        executor_backend, data_dir, instrumentation)
+        tenant.analyzer.sampling = monitor.SAMPLING
+        instrument_components(instrumentation, monitor if not tenants else None, tenant.analyzer, tenant.planner, tenant.executor)
+        tenants.append(tenant)
+
+    # warm start: restore the last snapshot, backfill the windows from one history query when it is stale
+    checkpoint_config = knowledge.get_checkpoint()
+    stale = [tenant for tenant in tenants if not tenant.restore_checkpoint(checkpoint_config.get("max_age", 300))]
+    if stale:
+        cycles_needed = max(config["size"] for config in stale[0].analyzer.window_configs.values())
+        now = int(time.time())
+        try:
+            history = monitor.fetch_history(monitor_metrics, now - cycles_needed * sleep, now, sleep)
+            for tenant in stale:
+                tenant.analyzer.backfill([monitor.split_namespaces(cycle)[tenant.namespace] for cycle in history])
+        except Exception as e:
+            print(f"Backfill failed, starting with empty windows: {e}")
+
+    if metrics_port:
+        instrumentation.serve(metrics_port)
+
+    # knowledge files are re-read when they change, tenants pick up the new policy between cycles
+    for tenant_knowledge in {id(tenant.knowledge): tenant.knowledge for tenant in tenants}.values():
+        tenant_knowledge.watch(knowledge_poll_interval)
+
+    scheduler_config = knowledge.get_scheduler()
+    scheduler = Scheduler(sleep, scheduler_config.get("budgets"), scheduler_config.get("lag", 0))
+    # adaptive monitoring: polls every min_period seconds while something is wrong, backs off to SLEEP otherwise
+    adaptive = scheduler_config.get("adaptive", {})
+    adaptive_period = None
+    if adaptive.get("enabled", False):
+        adaptive_period = AdaptivePeriod(
+            max(adaptive.get("min_period", 10), monitor.SAMPLING),
+            adaptive.get("max_period", sleep),
+            adaptive.get("backoff", 2),
+            adaptive.get("rps_change", 0.5)
+        )
+        scheduler.set_period(adaptive_period.period)
 
     print("")
-    print("Starting MAPE-K adaptation loop...")
-    cycle_count = 0
+    print(f"Starting MAPE-K adaptation loop for {', '.join(namespaces)}...")
 
-    # Start monitor and analyze
-    while True:
-        cycle_count += 1
-        print(f"\n=== Adaptation Cycle {cycle_count} ===")
-        print("")
-        # MONITOR: Collect metrics
-        print("[Monitoring Stage]")
-        print("Getting metrics from IBM Cloud...")
-        print("")
-        data_dict = {}
-        for metric, agg in monitor_metrics:
-            res = monitor.fetch_data_from_ibm(metric, agg)
-            if res:
-                data_dict[(metric, agg)] = res
-            else:
-                print(f"Failed to fetch {metric} with {agg} aggregation")
-        
-        # ANALYZE: Process metrics
-        print("[Analyzing Stage]")
-        analysis_results = analyzer.process_data(data_dict)
-        if len(analysis_results) == 0:
-            print("Need to gather more data to continue, preventing from scaling flapping")
-            time.sleep(sleep)
-            continue
-
-        # PLAN: Generate adaptation decisions
-        print("[Planning Stage]")
-        decisions, new_configs, system_situations = planner.evaluate_services(analysis_results, current_configs)
-        print("")
-
-        # EXECUTE: Apply adaptations
-        print("[Executing Stage]")
-        success = executor.execute_plan(decisions, current_configs, system_situations)
-        if success:
-            print("Successfully executed adaptation")
-            current_configs = new_configs
-        else:
-            print("Failed to execute adaptation")
+    # make SIGTERM go through the cleanup below
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
-        # KNOWLEDGE: Store data with adaptation information
-        timestamp = datetime.now().isoformat()
-        append_to_csv(csv_file, timestamp, data_dict, service_to_use)
+    def step(tenant, cycle, data_dict, timestamp):
+        # a failing tenant must not take the others down
+        try:
+            return tenant.step(cycle, data_dict, timestamp)
+        except Exception as e:
+            print(f"[{tenant.namespace}][ERROR] Cycle failed: {e}")
+            return False
+        finally:
+            tenant.save_checkpoint()
 
-        # wait for next round
-        time.sleep(sleep)
+    # Start monitor and analyze
+    pool = ThreadPoolExecutor(max_workers=len(tenants), thread_name_prefix="tenant")
+    try:
+        for cycle in scheduler.cycles():
+            started = instrumentation.begin_cycle()
+            executed = False
+            try:
+                print(f"\n=== Adaptation Cycle {cycle.number} ===")
+                print("")
+                # MONITOR: Collect metrics
+                print("[Monitoring Stage]")
+                print("Getting metrics from IBM Cloud...")
+                print("")
+                monitor.set_window(cycle.start_ts, cycle.end_ts)
+                data_dicts = monitor.split_namespaces(monitor.collect(monitor_metrics, max(cycle.remaining("monitor"), 0)))
+                timestamp = datetime.now().isoformat()
+
+                # ANALYZE, PLAN, EXECUTE: every tenant on its own state, side by side
+                if len(tenants) == 1:
+                    results = [step(tenants[0], cycle, data_dicts[tenants[0].namespace], timestamp)]
+                else:
+                    results = list(pool.map(
+                        lambda tenant: step(tenant, cycle, data_dicts[tenant.namespace], timestamp), tenants
+                    ))
+                executed = any(results)
+
+                if adaptive_period:
+                    observations = {
+                        f"{tenant.namespace}/{svc}": observation
+                        for tenant in tenants for svc, observation in tenant.analyzer.observations.items()
+                    }
+                    scheduler.set_period(adaptive_period.update(any(tenant.alerting for tenant in tenants), observations))
+            finally:
+                instrumentation.end_cycle(cycle.number, started, executed)
+    finally:
+        pool.shutdown(wait=True)
+        # flush archived responses and buffered dataset rows still queued
+        archive.close()
+        for tenant in tenants:
+            tenant.close()
+        instrumentation.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+from kubernetes import client, config
+from kubernetes.client.rest import ApiException
+
+class KubernetesActuator:
+    def __init__(self, namespace, api_client=None):
+        if api_client is None:
+            try:
+                config.load_incluster_config()
+            except config.ConfigException:
+                # kubeconfig written by `oc login`
+                config.load_kube_config()
+            api_client = client.ApiClient()
+        # one ApiClient keeps a pooled HTTPS connection for every call
+        self.api_client = api_client
+        self.apps = client.AppsV1Api(api_client)
+        self.namespace = namespace
+
+    def _container_name(self, svc):
+        return f"{svc}-java"
+
+    def _patch_body(self, svc, adaptation, mode):
+        resources = {
+            "limits": {
+                "cpu": f"{adaptation['limits']['cpu']}m",
+                "memory": f"{adaptation['limits']['memory']}Mi"
+            }
+        }
+        # warning only moves the limits, unhealthy moves requests and limits
+        if mode == "unhealthy":
+            resources["requests"] = {
+                "cpu": f"{adaptation['requests']['cpu']}m",
+                "memory": f"{adaptation['requests']['memory']}Mi"
+            }
+        return {
+            "spec": {
+                "replicas": adaptation["replica"],
+                "template": {
+                    "spec": {
+                        "containers": [{"name": self._container_name(svc), "resources": resources}]
+                    }
+                }
+            }
+        }
+
+    def _patch(self, svc, body, dry_run=False):
+        # a dict body is sent as a strategic-merge patch, containers are merged by name
+        kwargs = {"dry_run": "All"} if dry_run else {}
+        return self.apps.patch_namespaced_deployment(svc, self.namespace, body, **kwargs)
+
+    def dry_run(self, svc, adaptation, mode):
+        try:
+            self._patch(svc, self._patch_body(svc, adaptation, mode), dry_run=True)
+            return True, ""
+        except ApiException as e:
+            return False, f"{e.status} {e.reason}: {e.body}"
+        except Exception as e:
+            return False, str(e)
+
+    def _snapshot(self, quantities):
+        # a strategic-merge null deletes a key, so what the original spec did not set is removed again on rollback
+        if not quantities:
+            return None
+        return {"cpu": None, "memory": None, **quantities}
+
+    def backup(self, svc):
+        # keep only what an adaptation can change, enough to patch it back
+        try:
+            deployment = self.apps.read_namespaced_deployment(svc, self.namespace)
+        except Exception as e:
+            print(f"[BACKUP][WARNING] Failed to read deployment {svc}: {e}")
+            return None
+        containers = []
+        for container in deployment.spec.template.spec.containers:
+            resources = container.resources
+            containers.append({
+                "name": container.name,
+                "resources": {
+                    "requests": self._snapshot(resources.requests if resources else None),
+                    "limits": self._snapshot(resources.limits if resources else None)
+                }
+            })
+        return {
+            "spec": {
+                "replicas": deployment.spec.replicas,
+                "template": {"spec": {"containers": containers}}
+            }
+        }
+
+    def apply(self, svc, adaptation, mode):
+        try:
+            self._patch(svc, self._patch_body(svc, adaptation, mode))
+            return True, ""
+        except ApiException as e:
+            return False, f"{e.status} {e.reason}: {e.body}"
+        except Exception as e:
+            return False, str(e)
+
+    def rollback(self, svc, snapshot):
+        try:
+            self._patch(svc, snapshot)
+            return True, ""
+        except ApiException as e:
+            return False, f"{e.status} {e.reason}: {e.body}"
+        except Exception as e:
+            return False, str(e)
+
+    def status(self, svc):
+        deployment = self.apps.read_namespaced_deployment_status(svc, self.namespace)
+        status = deployment.status
+        return {
+            "generation": deployment.metadata.generation or 0,
+            "observed_generation": status.observed_generation or 0,
+            "replicas": deployment.spec.replicas,
+            "total": status.replicas or 0,
+            "updated": status.updated_replicas or 0,
+            "ready": status.ready_replicas or 0,
+            "available": status.available_replicas or 0
+        }
@@ -0,0 +1,47 @@
+import numpy as np
+
+class Aggregator:
+    def __init__(self, service_to_use):
+        self.services = service_to_use
+        self.service_index = {svc: idx for idx, svc in enumerate(service_to_use)}
+
+    def _parse(self, res):
+        # parse a raw response once into (service index, value) arrays
+        data = res.get("data", []) if res else []
+        services = np.fromiter(
+            (self.service_index.get(e["d"][0], -1) for e in data), dtype=np.int64, count=len(data)
+        )
+        values = np.array([e["d"][1] for e in data], dtype=np.float64)
+        return services, values
+
+    def aggregate(self, data_dict):
+        # per-service mean of every metric, computed with a single bincount over all samples
+        keys = list(data_dict.keys())
+        n_services = len(self.services)
+        service_parts, value_parts, metric_parts = [], [], []
+        for metric_idx, key in enumerate(keys):
+            services, values = self._parse(data_dict[key])
+            service_parts.append(services)
+            value_parts.append(values)
+            metric_parts.append(np.full(len(services), metric_idx, dtype=np.int64))
+
+        outputs = {svc: {} for svc in self.services}
+        if not keys:
+            return outputs
+
+        services = np.concatenate(service_parts)
+        values = np.concatenate(value_parts)
+        metrics = np.concatenate(metric_parts)
+
+        # drop samples of other deployments and empty values, like groupby().mean() does
+        valid = (services >= 0) & ~np.isnan(values)
+        bins = metrics[valid] * n_services + services[valid]
+        size = len(keys) * n_services
+        sums = np.bincount(bins, weights=values[valid], minlength=size).reshape(len(keys), n_services)
+        counts = np.bincount(bins, minlength=size).reshape(len(keys), n_services)
+
+        for metric_idx, svc_idx in zip(*np.nonzero(counts)):
+            key = keys[metric_idx]
+            outputs[self.services[svc_idx]][key] = float(sums[metric_idx, svc_idx] / counts[metric_idx, svc_idx])
+        return outputs
+
@@ -1,26 +1,70 @@
+import io
 import json
+import contextlib
 from collections import deque
 
-import pandas as pd
+from mapek.Aggregator import Aggregator
+from mapek.RollingStats import RollingStats
+from mapek.ChangeDetector import ChangeDetector
+from mapek.Sketch import DDSketch
+
+# latency percentiles kept per service, in ms
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+# every flag that means the service is too slow
+LATENCY_HIGH = {"latency_avg_high", "latency_p50_high", "latency_p95_high", "latency_p99_high", "latency_max_high"}
 
 class Analyzer:
-    def __init__(self, analyze_metrics, service_to_use, thresholds, weights):
+    def __init__(self, analyze_metrics, service_to_use, thresholds, weights, analysis=None):
+        analysis = analysis or {}
         self.window_size = 5
         self.metrics = analyze_metrics
         self.services = service_to_use
-        
-        self.deque_keys = ["cpu_deque", "memory_deque", "latency_avg_deque", "error_rate_deque"]
-        self.service_deque = {
-            svc: {key: deque(maxlen=self.window_size) for key in self.deque_keys}
+        self.aggregator = Aggregator(service_to_use)
+        self.observations = {}
+        # seconds covered by one Monitor sample, counters are summed per sample
+        self.sampling = 10
+        # services rolling out or warming up, their samples stay out of the windows
+        self.warming = set()
+        self.mask_warming = True
+
+        # per-metric window length, smoothing ("sma" or "ewma") and optional stability bound
+        self.confidence_threshold = analysis.get("confidence", 0.8)
+        self.stats_keys = ["cpu", "memory", "latency_avg", "error_rate"]
+        self.window_configs = {
+            key: {"size": self.window_size, "smoothing": "sma", **analysis.get("windows", {}).get(key, {})}
+            for key in self.stats_keys
+        }
+        self.service_stats = {
+            svc: {key: self._create_stats(key) for key in self.stats_keys}
             for svc in service_to_use
         }
 
+        # one sketch of the per-sample latencies per cycle, merged over the last `window` cycles for the percentiles
+        self.latency = analysis.get("latency", {})
+        self.latency_target = self.latency.get("target", "avg")
+        self.latency_sketches = {svc: deque(maxlen=self.latency.get("window", self.window_size)) for svc in service_to_use}
+
+        # a change point restarts the window at the new level, the old window is kept until the change is confirmed
+        # and put back when it turns out to be a one-off spike
+        self.detection = analysis.get("detection", {})
+        self.detectors = {
+            svc: {key: self._create_detector() for key in self.stats_keys}
+            for svc in service_to_use
+        } if self.detection.get("enabled", False) else None
+        self.pending_stats = {svc: {} for svc in service_to_use}
+
+        self.set_policy(thresholds, weights)
+
+    def set_policy(self, thresholds, weights):
+        # called between cycles on a knowledge reload, the rolling windows are kept
         self.cpu_threshold_high = thresholds["cpu"]["high"]
         self.cpu_threshold_low = thresholds["cpu"]["low"]
         self.memory_threshold_high = thresholds["memory"]["high"]
         self.memory_threshold_low = thresholds["memory"]["low"]
         self.latency_avg_threshold = thresholds["latency"]["avg"]
         self.latency_max_threshold = thresholds["latency"]["max"]
+        # the latency the utility and the SLO check look at, "avg" or one of the percentiles
+        self.latency_target_threshold = thresholds["latency"].get(self.latency_target, self.latency_avg_threshold)
         self.error_rate_threshold = thresholds["error_rate"]
 
         self.cpu_weight = weights["cpu"]
@@ -28,7 +72,124 @@ class Analyzer:
         self.latency_weight = weights["latency"]
         self.error_rate_weight = weights["error_rate"]
 
-    def _evaluate_metrics(self, svc, cpu, memory, latency_avg, latency_max, request_count, request_per_second, request_byte_total, error_rate, gc_time):
+    def set_warming(self, services, mask=True):
+        self.warming = set(services)
+        self.mask_warming = mask
+
+    def checkpoint(self):
+        return {
+            "windows": {svc: {key: stats.state() for key, stats in service.items()} for svc, service in self.service_stats.items()},
+            "pending": {svc: {key: stats.state() for key, stats in service.items()} for svc, service in self.pending_stats.items()},
+            "detectors": {
+                svc: {key: detector.state() for key, detector in detectors.items()}
+                for svc, detectors in self.detectors.items()
+            } if self.detectors is not None else {}
+        }
+
+    def restore(self, state):
+        for svc, service in state.get("windows", {}).items():
+            if svc not in self.service_stats:
+                continue
+            for key, stats_state in service.items():
+                if key in self.service_stats[svc]:
+                    self.service_stats[svc][key] = self._create_stats(key)
+                    self.service_stats[svc][key].restore(stats_state)
+        for svc, service in state.get("pending", {}).items():
+            if svc not in self.pending_stats:
+                continue
+            for key, stats_state in service.items():
+                if key in self.service_stats[svc]:
+                    self.pending_stats[svc][key] = self._create_stats(key)
+                    self.pending_stats[svc][key].restore(stats_state)
+        if self.detectors is None:
+            return
+        for svc, detectors in state.get("detectors", {}).items():
+            for key, detector_state in detectors.items():
+                if key in self.detectors.get(svc, {}):
+                    self.detectors[svc][key].restore(detector_state)
+
+    def backfill(self, cycles):
+        # fill the windows from past cycles without producing analysis results
+        with contextlib.redirect_stdout(io.StringIO()):
+            for data_dict in cycles:
+                self.process_data(data_dict)
+        print(f"Backfilled analysis windows with {len(cycles)} past cycles")
+
+    def _create_stats(self, key):
+        config = self.window_configs[key]
+        return RollingStats(config["size"], config["smoothing"], config.get("alpha", 0.3))
+
+    def _create_detector(self):
+        return ChangeDetector(
+            self.detection.get("window", 30),
+            self.detection.get("min_samples", 10),
+            self.detection.get("z", 3.5),
+            self.detection.get("k", 0.5),
+            self.detection.get("h", 5.0),
+            self.detection.get("min_scale", 0.05),
+            self.detection.get("repeats", 2)
+        )
+
+    def _append(self, svc, key, value):
+        stats = self.service_stats[svc]
+        if self.detectors is None:
+            stats[key].append(value)
+            return None
+        detector = self.detectors[svc][key]
+        anomaly = detector.update(value)
+        if anomaly == "outlier":
+            # the last change point was a spike, the window from before it continues with this sample
+            stats[key] = self.pending_stats[svc].pop(key, stats[key])
+            stats[key].append(value)
+        elif anomaly:
+            # the old level no longer applies, the window is reseeded at the level of the new regime
+            if detector.pending is not None:
+                self.pending_stats[svc][key] = stats[key]
+            else:
+                self.pending_stats[svc].pop(key, None)
+            stats[key] = self._create_stats(key)
+            level = sum(detector.regime) / len(detector.regime)
+            for _ in range(stats[key].window_size - len(detector.regime)):
+                stats[key].append(level)
+            for recent in detector.regime[-stats[key].window_size:]:
+                stats[key].append(recent)
+        else:
+            if detector.pending is None:
+                self.pending_stats[svc].pop(key, None)
+            stats[key].append(value)
+        return anomaly
+
+    def _latency_samples(self, data_dict):
+        # per-service latency samples in ms, straight from the Monitor response instead of their mean
+        samples = {svc: [] for svc in self.services}
+        res = data_dict.get(("net.request.time.in", "avg"))
+        for e in (res or {}).get("data", []):
+            if e["d"][0] in samples and e["d"][1] is not None:
+                samples[e["d"][0]].append(e["d"][1] / 1000000)
+        return samples
+
+    def _percentiles(self, svc, samples):
+        sketch = DDSketch(self.latency.get("relative_accuracy", 0.01))
+        for value in samples:
+            sketch.add(value)
+        self.latency_sketches[svc].append(sketch)
+        merged = DDSketch(self.latency.get("relative_accuracy", 0.01))
+        for cycle_sketch in self.latency_sketches[svc]:
+            merged.merge(cycle_sketch)
+        return {f"latency_{name}": merged.quantile(q) for name, q in PERCENTILES.items()}
+
+    def _confidence(self, stats):
+        # share of the required samples collected, scaled down when a signal is too noisy
+        confidence = 1.0
+        for key, config in self.window_configs.items():
+            min_samples = config.get("min_samples", config["size"])
+            confidence = min(confidence, len(stats[key]) / min_samples)
+            max_cv = config.get("max_cv")
+            if max_cv is not None and stats[key].cv() > max_cv:
+                confidence *= max_cv / stats[key].cv()
+        return confidence
+
+    def _evaluate_metrics(self, svc, cpu, memory, latency_avg, latency_max, request_count, request_per_second, request_byte_total, error_rate, gc_time, replicas=0, latency_samples=None):
         print(f"""
             CPU: {cpu:.2f}%
             Memory: {memory:.2f}%
@@ -39,18 +200,24 @@ class Analyzer:
             Request Byte Total: {request_byte_total*1.024/1000:.2f} KB/s
             Error Rate: {error_rate:.2f}%
             GC Time: {gc_time / 1000:.2f} ms
+            Replicas: {replicas:.0f}
         """)
 
-        deques = self.service_deque[svc]
-        deques["cpu_deque"].append(cpu)
-        deques["memory_deque"].append(memory)
-        deques["latency_avg_deque"].append(latency_avg/1000000)
-        deques["error_rate_deque"].append(error_rate)
+        samples = {"cpu": cpu, "memory": memory, "latency_avg": latency_avg/1000000, "error_rate": error_rate}
+        anomalies = {}
+        for key, value in samples.items():
+            anomaly = self._append(svc, key, value)
+            if anomaly:
+                print(f"{svc}: {key} {anomaly.replace('_', ' ')}")
+                anomalies[key] = anomaly
+        stats = self.service_stats[svc]
+        percentiles = self._percentiles(svc, latency_samples or [])
+        print(f"{svc} latency: " + ", ".join(f"{name[8:]}={value:.2f} ms" for name, value in percentiles.items()))
 
-        cpu_avg = sum(deques["cpu_deque"]) / len(deques["cpu_deque"])
-        memory_avg = sum(deques["memory_deque"]) / len(deques["memory_deque"])
-        latency_avg_avg = sum(deques["latency_avg_deque"]) / len(deques["latency_avg_deque"])
-        error_rate_avg = sum(deques["error_rate_deque"]) / len(deques["error_rate_deque"])
+        cpu_avg = stats["cpu"].smoothed()
+        memory_avg = stats["memory"].smoothed()
+        latency_avg_avg = stats["latency_avg"].smoothed()
+        error_rate_avg = stats["error_rate"].smoothed()
 
         unhealthy_metrics = set()
         result = {
@@ -63,18 +230,23 @@ class Analyzer:
             "request_byte_total": request_byte_total,
             "error_rate": error_rate_avg,
             "gc_time": gc_time,
+            "replicas": replicas,
             "overall_utility": 0,
             "adaptation": "",
-            "unhealthy_metrics": unhealthy_metrics
+            "unhealthy_metrics": unhealthy_metrics,
+            "anomalies": anomalies,
+            **percentiles,
+            "variance": {key: stats[key].variance() for key in self.stats_keys}
         }
 
-
-        confidence = len(deques["cpu_deque"]) / self.window_size
-        if confidence >= 0.8:
+        confidence = self._confidence(stats)
+        result["confidence"] = confidence
+        if confidence >= self.confidence_threshold:
             # analyze global health
             cpu_utility = self._normalize_high_is_good(self.cpu_threshold_low, self.cpu_threshold_high, cpu_avg)
             memory_utility = self._normalize_high_is_good(self.memory_threshold_low, self.memory_threshold_high, memory_avg)
-            latency_utility = self._normalize_low_is_good(self.latency_avg_threshold, latency_avg_avg/1000000)
+            latency = latency_avg_avg if self.latency_target == "avg" else percentiles[f"latency_{self.latency_target}"]
+            latency_utility = self._normalize_low_is_good(self.latency_target_threshold, latency)
             error_rate_utility = self._normalize_low_is_good(self.error_rate_threshold, error_rate_avg)
             overall_utility = cpu_utility * self.cpu_weight + memory_utility * self.memory_weight + latency_utility * self.latency_weight + error_rate_utility * self.error_rate_weight
             result["overall_utility"] = overall_utility
@@ -90,8 +262,10 @@ class Analyzer:
             elif memory_avg < self.memory_threshold_low:
                 unhealthy_metrics.add("memory_low")
             
-            if latency_avg_avg > self.latency_avg_threshold:
-                unhealthy_metrics.add("latency_avg_high")
+            if latency > self.latency_target_threshold:
+                unhealthy_metrics.add(f"latency_{self.latency_target}_high")
+            if latency_max/1000000 > self.latency_max_threshold:
+                unhealthy_metrics.add("latency_max_high")
             
             if error_rate_avg > self.error_rate_threshold:
                 unhealthy_metrics.add("error_rate_high")
@@ -110,30 +284,27 @@ class Analyzer:
         else:
             return None
 
-    def _create_dataframe(self, data):
-        return pd.DataFrame([{
-            "timestamp": e['t'], "service": e['d'][0], "value": e['d'][1]
-        } for e in data["data"]])
-
-    def process_data(self, data_dict):
+    def process_data(self, data_dict, aggregated=None):
+        # aggregated: per-service means from Aggregator, shared with the CSV writer
+        if aggregated is None:
+            aggregated = self.aggregator.aggregate(data_dict)
         outputs = {svc: {} for svc in self.services}
         analysis_results = {}
+        self.observations = {}
 
         for idx, (metric_id, aggregation) in enumerate(self.metrics):
-            data = data_dict.get((metric_id, aggregation))
-            if data is None:
+            if data_dict.get((metric_id, aggregation)) is None:
                 print(f"No data for metric {metric_id} with aggregation {aggregation}")
                 continue
 
-            df = self._create_dataframe(data)
-            df_filtered = df[df['service'].isin(self.services)]
-            avg_values = df_filtered.groupby('service')['value'].mean()
-
             metric_name = f"{metric_id}_{aggregation}"
 
-            for svc, val in avg_values.items():
-                outputs[svc][metric_name] = val
+            for svc in self.services:
+                val = aggregated.get(svc, {}).get((metric_id, aggregation))
+                if val is not None:
+                    outputs[svc][metric_name] = val
 
+        latency_samples = self._latency_samples(data_dict)
         for svc, metric_values in outputs.items():
             print("//////////////////////////////////////////")
             print(f"Service: {svc}")
@@ -143,7 +314,7 @@ class Analyzer:
             latency_max = metric_values.get("net.request.time.in_max", 0)
             # Traffic
             request_count = metric_values.get("net.request.count.in_sum", 0)
-            request_per_second = metric_values.get("net.request.count.in_sum", 0) / 10
+            request_per_second = metric_values.get("net.request.count.in_sum", 0) / self.sampling
             request_byte_total = metric_values.get("net.bytes.total_sum", 0)
             # Errors
             errors = metric_values.get("net.http.error.count_sum", 0)
@@ -153,10 +324,28 @@ class Analyzer:
             memory = metric_values.get("memory.limit.used.percent_avg", 0)
             # Other
             gc_time = metric_values.get("jvm.gc.global.time_avg", 0)
+            replicas = metric_values.get("kubernetes.deployment.replicas.available_max", 0)
+
+            # raw values of this cycle, available even while the windows warm up
+            if metric_values:
+                self.observations[svc] = {
+                    "cpu": cpu,
+                    "memory": memory,
+                    "latency_avg": latency_avg/1000000,
+                    "request_per_second": request_per_second,
+                    "error_rate": error_rate,
+                    "replicas": replicas,
+                    "warming": svc in self.warming
+                }
+
+            if svc in self.warming and self.mask_warming:
+                print(f"{svc} is warming up after a rollout, sample masked")
+                continue
 
-            result = self._evaluate_metrics(svc, cpu, memory, latency_avg, latency_max, request_count, request_per_second, request_byte_total, error_rate, gc_time)
+            result = self._evaluate_metrics(svc, cpu, memory, latency_avg, latency_max, request_count, request_per_second, request_byte_total, error_rate, gc_time, replicas, latency_samples[svc])
             if result != None:
                 result["service"] = svc
+                result["warming"] = svc in self.warming
                 analysis_results[svc] = result
 
         return analysis_results
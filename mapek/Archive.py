@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import queue
+import threading
+
+import numpy as np
+
+COLUMNS = ["fetched", "t", "metric", "service", "value"]
+
+def _codes(dictionary):
+    # dictionary.json keeps the names in code order
+    return {key: {name: code for code, name in enumerate(names)} for key, names in dictionary.items()}
+
+
+class RawArchive:
+    def __init__(self, root="datasets/archive", segment_seconds=3600, flush_interval=5):
+        self.root = root
+        self.segment_seconds = segment_seconds
+        self.flush_interval = flush_interval
+        os.makedirs(self.root, exist_ok=True)
+
+        self.queue = queue.Queue()
+        self.dictionaries = {}
+        self.sequence = 0
+        self.thread = None
+
+    # ---------- writer ----------
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._writer_loop, name="raw-archive", daemon=True)
+            self.thread.start()
+        return self
+
+    def append(self, metric, aggregation, res):
+        # never blocks the MAPE-K loop, the writer thread does the disk I/O
+        self.queue.put((time.time(), metric, aggregation, res))
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def _writer_loop(self):
+        self._seal_old_segments(time.time())
+        pending = []
+        started = None
+        running = True
+        while running:
+            # responses of a whole cycle go into one chunk, written flush_interval after the first one or on close
+            timeout = max(0.0, started + self.flush_interval - time.time()) if pending else self.flush_interval
+            try:
+                item = self.queue.get(timeout=timeout)
+                if item is None:
+                    running = False
+                else:
+                    if not pending:
+                        started = time.time()
+                    pending.append(item)
+            except queue.Empty:
+                pass
+            if pending and (not running or time.time() - started >= self.flush_interval):
+                try:
+                    self._write_chunk(pending)
+                except Exception as e:
+                    print(f"[ARCHIVE][ERROR] Failed to write {len(pending)} responses: {e}")
+                pending = []
+                self._seal_old_segments(time.time())
+
+    def _segment_start(self, ts):
+        return int(ts // self.segment_seconds) * self.segment_seconds
+
+    def _segment_dir(self, segment_start):
+        return os.path.join(self.root, f"segment_{segment_start}")
+
+    def _dictionary(self, segment_dir):
+        # name -> code per column, kept in insertion order so the codes are the list positions on disk
+        if segment_dir not in self.dictionaries:
+            path = os.path.join(segment_dir, "dictionary.json")
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    self.dictionaries[segment_dir] = _codes(json.load(f))
+            else:
+                self.dictionaries[segment_dir] = {"metrics": {}, "services": {}}
+        return self.dictionaries[segment_dir]
+
+    def _code(self, codes, name):
+        if name not in codes:
+            codes[name] = len(codes)
+        return codes[name]
+
+    def _write_chunk(self, items):
+        by_segment = {}
+        for item in items:
+            by_segment.setdefault(self._segment_start(item[0]), []).append(item)
+
+        for segment_start, segment_items in by_segment.items():
+            segment_dir = self._segment_dir(segment_start)
+            os.makedirs(segment_dir, exist_ok=True)
+            dictionary = self._dictionary(segment_dir)
+
+            columns = {name: [] for name in COLUMNS}
+            for fetched, metric, aggregation, res in segment_items:
+                metric_code = self._code(dictionary["metrics"], f"{metric}|{aggregation}")
+                for e in (res or {}).get("data", []):
+                    columns["fetched"].append(fetched)
+                    columns["t"].append(e["t"])
+                    columns["metric"].append(metric_code)
+                    columns["service"].append(self._code(dictionary["services"], e["d"][0]))
+                    columns["value"].append(np.nan if e["d"][1] is None else e["d"][1])
+
+            # dictionary first, so every chunk on disk can be decoded
+            self._write_json(os.path.join(segment_dir, "dictionary.json"), {key: list(codes) for key, codes in dictionary.items()})
+            arrays = {
+                "fetched": np.asarray(columns["fetched"], dtype=np.float64),
+                "t": np.asarray(columns["t"], dtype=np.int64),
+                "metric": np.asarray(columns["metric"], dtype=np.int32),
+                "service": np.asarray(columns["service"], dtype=np.int32),
+                "value": np.asarray(columns["value"], dtype=np.float64),
+            }
+            # several chunks can be written within the same millisecond
+            self.sequence += 1
+            chunk = f"chunk_{int(segment_items[0][0] * 1000)}_{self.sequence:06d}"
+            for name, array in arrays.items():
+                tmp_path = os.path.join(segment_dir, f"{chunk}_{name}.tmp.npy")
+                np.save(tmp_path, array)
+                os.replace(tmp_path, os.path.join(segment_dir, f"{chunk}_{name}.npy"))
+
+    def _write_json(self, path, data):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _seal_old_segments(self, now):
+        # closed segments are merged into one uncompressed .npy per column, so a reader can memory-map them;
+        # the strings are already dictionary-coded and a zip member could only be read in full
+        current = self._segment_start(now)
+        for segment_start, segment_dir in self._segments():
+            if segment_start >= current or self._sealed(segment_dir):
+                continue
+            chunks = self._chunks(segment_dir)
+            if not chunks:
+                continue
+            merged = {
+                name: np.concatenate([np.load(os.path.join(segment_dir, f"{chunk}_{name}.npy")) for chunk in chunks])
+                for name in COLUMNS
+            }
+            # "fetched" goes last, the segment only counts as sealed once every column is in place
+            for name in COLUMNS[1:] + COLUMNS[:1]:
+                tmp_path = os.path.join(segment_dir, f"segment_{name}.tmp.npy")
+                np.save(tmp_path, merged[name])
+                os.replace(tmp_path, os.path.join(segment_dir, f"segment_{name}.npy"))
+            for chunk in chunks:
+                for name in COLUMNS:
+                    os.remove(os.path.join(segment_dir, f"{chunk}_{name}.npy"))
+            self.dictionaries.pop(segment_dir, None)
+            print(f"[ARCHIVE] Sealed {segment_dir} ({len(merged['t'])} samples)")
+
+    # ---------- reader ----------
+    def _segments(self):
+        if not os.path.exists(self.root):
+            return []
+        segments = []
+        for name in os.listdir(self.root):
+            if name.startswith("segment_"):
+                segments.append((int(name[len("segment_"):]), os.path.join(self.root, name)))
+        return sorted(segments)
+
+    def _sealed(self, segment_dir):
+        return os.path.exists(os.path.join(segment_dir, "segment_fetched.npy"))
+
+    def _chunks(self, segment_dir):
+        suffix = "_fetched.npy"
+        return sorted(
+            name[:-len(suffix)] for name in os.listdir(segment_dir)
+            if name.startswith("chunk_") and name.endswith(suffix)
+        )
+
+    def read(self, start, end, metric=None, aggregation=None):
+        # collection-time range [start, end), only the segments overlapping it are opened
+        # and their columns are memory-mapped, so the rest of the history is never loaded
+        parts = {name: [] for name in COLUMNS}
+        metric_codes, service_codes = {}, {}
+        for segment_start, segment_dir in self._segments():
+            if segment_start + self.segment_seconds <= start or segment_start >= end:
+                continue
+            with open(os.path.join(segment_dir, "dictionary.json"), "r") as f:
+                dictionary = _codes(json.load(f))
+
+            if self._sealed(segment_dir):
+                sources = [
+                    {name: np.load(os.path.join(segment_dir, f"segment_{name}.npy"), mmap_mode="r") for name in COLUMNS}
+                ]
+            else:
+                sources = [
+                    {name: np.load(os.path.join(segment_dir, f"{chunk}_{name}.npy"), mmap_mode="r") for name in COLUMNS}
+                    for chunk in self._chunks(segment_dir)
+                ]
+
+            for columns in sources:
+                mask = (columns["fetched"] >= start) & (columns["fetched"] < end)
+                if metric is not None:
+                    wanted = f"{metric}|{aggregation}"
+                    if wanted not in dictionary["metrics"]:
+                        continue
+                    mask &= columns["metric"] == dictionary["metrics"][wanted]
+                if not mask.any():
+                    continue
+                # re-code the strings against one dictionary for the whole result
+                metric_map = np.array([self._code(metric_codes, m) for m in dictionary["metrics"]], dtype=np.int32)
+                service_map = np.array([self._code(service_codes, s) for s in dictionary["services"]], dtype=np.int32)
+                parts["fetched"].append(np.asarray(columns["fetched"][mask]))
+                parts["t"].append(np.asarray(columns["t"][mask]))
+                parts["metric"].append(metric_map[columns["metric"][mask]])
+                parts["service"].append(service_map[columns["service"][mask]])
+                parts["value"].append(np.asarray(columns["value"][mask]))
+
+        dtypes = {"fetched": np.float64, "t": np.int64, "metric": np.int32, "service": np.int32, "value": np.float64}
+        result = {
+            name: np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtypes[name])
+            for name in COLUMNS
+        }
+        result["metrics"] = list(metric_codes)
+        result["services"] = list(service_codes)
+        return result
+
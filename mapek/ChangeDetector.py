@@ -0,0 +1,116 @@
+import numpy as np
+
+class ChangeDetector:
+    # robust z-score against a running median/MAD, fed into a two-sided CUSUM, constant time per sample
+    def __init__(self, window=30, min_samples=10, z=3.5, k=0.5, h=5.0, min_scale=0.05, repeats=2):
+        # step size of the running estimates, they follow roughly the last `window` samples
+        self.rate = 2.0 / (window + 1)
+        self.min_samples = min_samples
+        self.z = z
+        self.k = k
+        self.h = h
+        # relative floor of the scale, a flat series would make every wiggle an outlier
+        self.min_scale = min_scale
+        # an extreme sample is a change point right away, it stays tentative until `repeats` samples in a row
+        # sit at the new level, a sample back at the old level before that turns it into an outlier
+        self.repeats = repeats
+        self.pending = None
+        self.upper = 0.0
+        self.lower = 0.0
+        self.median = 0.0
+        self.mad = 0.0
+        self.seed = []
+        # samples of the new regime after a change point
+        self.regime = []
+
+    def state(self):
+        return {
+            "median": self.median, "mad": self.mad, "upper": self.upper, "lower": self.lower,
+            "seed": list(self.seed), "regime": list(self.regime), "pending": self.pending
+        }
+
+    def restore(self, state):
+        self.median = state.get("median", 0.0)
+        self.mad = state.get("mad", 0.0)
+        self.upper = state.get("upper", 0.0)
+        self.lower = state.get("lower", 0.0)
+        self.seed = list(state.get("seed", []))
+        self.regime = list(state.get("regime", []))
+        self.pending = state.get("pending")
+
+    def _scale(self, median, mad):
+        return max(mad * 1.4826, self.min_scale * abs(median), 1e-9)
+
+    def _track(self, value):
+        # frugal streaming median and MAD, fixed steps toward the sample bound the pull of any outlier
+        step = self.rate * self._scale(self.median, self.mad)
+        if value > self.median:
+            self.median += step
+        elif value < self.median:
+            self.median -= step
+        deviation = abs(value - self.median)
+        if deviation > self.mad:
+            self.mad += step
+        elif deviation < self.mad:
+            self.mad = max(0.0, self.mad - step)
+
+    def _seed(self, value):
+        # the estimates start from the exact median/MAD of the first samples
+        self.seed.append(value)
+        if len(self.seed) == self.min_samples:
+            seed = np.array(self.seed)
+            self.median = float(np.median(seed))
+            self.mad = float(np.median(np.abs(seed - self.median)))
+
+    def update(self, value):
+        # returns "change_up", "change_down", "outlier" (the last change point was a one-off spike) or None
+        value = float(value)
+        if self.pending is not None:
+            return self._confirm(value)
+        if len(self.seed) < self.min_samples:
+            self._seed(value)
+            return None
+
+        score = (value - self.median) / self._scale(self.median, self.mad)
+        if abs(score) > self.z:
+            return self._change(1 if score > 0 else -1, value, self.repeats > 1)
+
+        # moderate shifts build up in the CUSUM until they pass h, that is evidence over several samples already
+        self._track(value)
+        self.upper = max(0.0, self.upper + score - self.k)
+        self.lower = max(0.0, self.lower - score - self.k)
+        if self.upper > self.h:
+            return self._change(1, value, False)
+        if self.lower > self.h:
+            return self._change(-1, value, False)
+        return None
+
+    def _change(self, side, value, tentative):
+        # the old level is kept until the new one is confirmed, the estimates restart from this sample
+        self.pending = {
+            "side": side, "count": 1, "median": self.median, "mad": self.mad, "seed": self.seed
+        } if tentative else None
+        self.regime = [value]
+        self.seed = []
+        self._seed(value)
+        self.upper = self.lower = 0.0
+        return "change_up" if side > 0 else "change_down"
+
+    def _confirm(self, value):
+        pending = self.pending
+        score = (value - pending["median"]) / self._scale(pending["median"], pending["mad"])
+        if score * pending["side"] > self.z:
+            # another sample at the new level
+            pending["count"] += 1
+            self.regime.append(value)
+            self._seed(value)
+            if pending["count"] >= self.repeats:
+                self.pending = None
+            return None
+
+        # back at the old level: put back its estimates, this sample belongs to it
+        self.median, self.mad, self.seed = pending["median"], pending["mad"], pending["seed"]
+        self.pending = None
+        self.regime = []
+        self._track(value)
+        return "outlier"
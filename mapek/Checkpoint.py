@@ -0,0 +1,33 @@
+import os
+import gzip
+import json
+import time
+
+class Checkpoint:
+    # compact gzipped JSON snapshot of the loop state, rewritten every cycle
+    def __init__(self, path="datasets/checkpoint.json.gz"):
+        self.path = path
+
+    def save(self, state):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_file = f"{self.path}.tmp"
+            with gzip.open(tmp_file, "wt") as f:
+                json.dump({"saved": time.time(), "state": state}, f, separators=(",", ":"))
+            os.replace(tmp_file, self.path)
+        except Exception as e:
+            print(f"[CHECKPOINT][ERROR] Failed to write {self.path}: {e}")
+
+    def load(self):
+        # (state, age in seconds), or (None, None) when there is nothing usable
+        if not os.path.exists(self.path):
+            return None, None
+        try:
+            with gzip.open(self.path, "rt") as f:
+                snapshot = json.load(f)
+            return snapshot["state"], time.time() - snapshot["saved"]
+        except Exception as e:
+            print(f"[CHECKPOINT][WARNING] Ignoring unreadable {self.path}: {e}")
+            return None, None
@@ -0,0 +1,69 @@
+from collections import deque
+
+import numpy as np
+
+from mapek.Analyzer import LATENCY_HIGH
+
+class DependencyGraph:
+    # caller -> downstream services, declared in knowledge.json or inferred from latency correlation
+    def __init__(self, service_to_use, graph=None, mode="declared", history=30, min_correlation=0.7):
+        self.services = service_to_use
+        self.declared = {svc: list(graph.get(svc, [])) for svc in service_to_use} if graph else None
+        self.mode = mode
+        self.min_correlation = min_correlation
+        self.latency = {svc: deque(maxlen=history) for svc in service_to_use}
+
+    def update(self, observations):
+        # only cycles where every service reported keep the series aligned
+        if not all(svc in observations for svc in self.services):
+            return
+        for svc in self.services:
+            self.latency[svc].append(observations[svc]["latency_avg"])
+
+    def _infer(self):
+        samples = len(self.latency[self.services[0]])
+        if samples < 5:
+            return self.declared or {svc: [] for svc in self.services}
+
+        series = np.array([self.latency[svc] for svc in self.services])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation = np.nan_to_num(np.corrcoef(series))
+        means = series.mean(axis=1)
+
+        # a caller's latency contains its callees', so the slower of a correlated pair is the caller
+        graph = {svc: [] for svc in self.services}
+        for i, caller in enumerate(self.services):
+            for j, callee in enumerate(self.services):
+                if i != j and correlation[i, j] >= self.min_correlation and means[i] > means[j]:
+                    graph[caller].append(callee)
+        return graph
+
+    def edges(self):
+        if self.mode == "inferred":
+            return self._infer()
+        return self.declared or {svc: [] for svc in self.services}
+
+    def root_causes(self, svc, degraded, graph=None, visited=None):
+        # follow degraded downstream services until none of their own dependencies is degraded
+        graph = graph or self.edges()
+        visited = visited or set()
+        visited.add(svc)
+        roots = set()
+        for callee in graph.get(svc, []):
+            if callee in degraded and callee not in visited:
+                roots |= self.root_causes(callee, degraded, graph, visited) or {callee}
+        return roots
+
+    def attribute(self, analysis_results):
+        # service -> root-cause services for every service whose latency comes from downstream
+        degraded = {
+            svc for svc, result in analysis_results.items()
+            if result and LATENCY_HIGH & result["unhealthy_metrics"]
+        }
+        graph = self.edges()
+        attribution = {}
+        for svc in degraded:
+            roots = self.root_causes(svc, degraded, graph) - {svc}
+            if roots:
+                attribution[svc] = roots
+        return attribution
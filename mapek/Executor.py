@@ -1,11 +1,17 @@
 import subprocess
 import os
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 class Executor:
-    def __init__(self):
+    def __init__(self, parallel=False, max_workers=5, actuator=None):
         self.backup_dir = "./backup"
         os.makedirs(self.backup_dir, exist_ok=True)
+        # run dry-runs, backups and applies of all services concurrently
+        self.parallel = parallel
+        self.max_workers = max(1, max_workers)
+        # KubernetesActuator patching deployments through the API instead of config.sh
+        self.actuator = actuator
 
     def _run(self, command):
         res = subprocess.run(
@@ -17,17 +23,26 @@ class Executor:
         )
         return res
 
-    def _dry_run(self, svc, mode):
-        cmd = f"sh ./mapek/config.sh --dry-run service={svc} mode={mode}"
-        res = self._run(cmd)
-        if res.returncode == 0:
+    def _dry_run(self, svc, mode, adaptation):
+        if self.actuator is not None:
+            ok, error = self.actuator.dry_run(svc, adaptation, mode)
+        else:
+            # validate the values that would be applied, not the script defaults
+            res = self._run(f"{self._command(svc, adaptation, mode)} --dry-run")
+            ok, error = res.returncode == 0, res.stderr
+        if ok:
             print(f"[DRY-RUN][OK] {svc} can be safely updated.")
             return True
         else:
-            print(f"[DRY-RUN][ERROR] {svc} verification failed:\n{res.stderr}")
+            print(f"[DRY-RUN][ERROR] {svc} verification failed:\n{error}")
             return False
 
     def _backup(self, svc):
+        if self.actuator is not None:
+            snapshot = self.actuator.backup(svc)
+            if snapshot is not None:
+                print(f"[BACKUP] {svc} deployment spec saved")
+            return snapshot
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = f"{self.backup_dir}/{svc}_{timestamp}.yaml"
         backup_cmd = f"oc get deploy {svc} -o yaml > {backup_path}"
@@ -40,17 +55,87 @@ class Executor:
             return None
 
     def _rollback(self, svc, backup_path):
-        if not backup_path or not os.path.exists(backup_path):
-            print(f"[ROLLBACK][ERROR] No valid backup found for {svc}.")
-            return
-        rollback_cmd = f"sh ./config.sh rollback service={svc} backup={backup_path}"
-        res = self._run(rollback_cmd)
-        if res.returncode == 0:
+        if self.actuator is not None:
+            if not backup_path:
+                print(f"[ROLLBACK][ERROR] No valid backup found for {svc}.")
+                return
+            ok, error = self.actuator.rollback(svc, backup_path)
+        else:
+            if not backup_path or not os.path.exists(backup_path):
+                print(f"[ROLLBACK][ERROR] No valid backup found for {svc}.")
+                return
+            rollback_cmd = f"sh ./mapek/config.sh rollback service={svc} backup={backup_path}"
+            res = self._run(rollback_cmd)
+            ok, error = res.returncode == 0, res.stderr
+        if ok:
             print(f"[ROLLBACK][OK] {svc} restored from backup.")
         else:
-            print(f"[ROLLBACK][FAIL] {svc} rollback failed:\n{res.stderr}")
+            print(f"[ROLLBACK][FAIL] {svc} rollback failed:\n{error}")
+
+    def _command(self, svc, adaptation, mode):
+        if mode == "warning":
+            return (
+                f"sh ./mapek/config.sh "
+                f"cpu_limits={adaptation['limits']['cpu']} memory_limits={adaptation['limits']['memory']} "
+                f"replica={adaptation['replica']} service={svc} mode={mode}"
+            )
+        return (
+            f"sh ./mapek/config.sh "
+            f"cpu_requests={adaptation['requests']['cpu']} cpu_limits={adaptation['limits']['cpu']} "
+            f"memory_requests={adaptation['requests']['memory']} memory_limits={adaptation['limits']['memory']} "
+            f"replica={adaptation['replica']} service={svc} mode={mode}"
+        )
+
+    def _report_changes(self, svc, adaptation, mode, config):
+        if adaptation["limits"]["cpu"] != config["limits"]["cpu"]:
+            print(f"CPU is changed from {config['limits']['cpu']} to {adaptation['limits']['cpu']} for {svc}")
+        if mode == "unhealthy" and adaptation["requests"]["cpu"] != config["requests"]["cpu"]:
+            print(f"CPU is changed from {config['requests']['cpu']} to {adaptation['requests']['cpu']} for {svc}")
+        if adaptation["limits"]["memory"] != config["limits"]["memory"]:
+            print(f"Memory is changed from {config['limits']['memory']} to {adaptation['limits']['memory']} for {svc}")
+        if mode == "unhealthy" and adaptation["requests"]["memory"] != config["requests"]["memory"]:
+            print(f"Memory is changed from {config['requests']['memory']} to {adaptation['requests']['memory']} for {svc}")
+        if adaptation["replica"] != config["replica"]:
+            print(f"Replica is changed from {config['replica']} to {adaptation['replica']} for {svc}")
+
+    def _apply(self, svc, adaptation, mode, configs):
+        print(f"Executing adaptation for {svc}...")
+        if mode not in ("warning", "unhealthy"):
+            return True
+
+        if self.actuator is not None:
+            ok, error = self.actuator.apply(svc, adaptation, mode)
+            output = ""
+        else:
+            res = self._run(self._command(svc, adaptation, mode))
+            ok, output, error = res.returncode == 0, res.stdout, res.stderr
+
+        if ok:
+            self._report_changes(svc, adaptation, mode, configs[svc])
+            print(output)
+            return True
+        print(f"{svc}: Adaptation failed with error:")
+        print(error)
+        return False
+
+    def _rollback_all(self, backups):
+        print("\n[STEP 3] Rolling back all previously modified services...")
+        for rollback_svc, backup_file in backups.items():
+            self._rollback(rollback_svc, backup_file)
+        print("[TRANSACTION][ABORTED] All changes reverted.")
+
+    def _out_of_time(self, expired):
+        # checked once the dry-runs are done, an apply that has started is completed or rolled back
+        if expired is not None and expired():
+            print("[ABORT] Out of time budget before applying. Transaction aborted, nothing changed.")
+            return True
+        return False
+
+    def execute_plan(self, plan, configs, system_situations, expired=None):
+        # expired: optional callable telling whether the execute budget of the cycle is used up
+        if self.parallel:
+            return self._execute_plan_parallel(plan, configs, system_situations, expired)
 
-    def execute_plan(self, plan, configs, system_situations):
         print("======== Starting Atomic Adaptation Transaction ========")
         success = True
         backups = {}
@@ -60,9 +145,11 @@ class Executor:
             if not adaptation:
                 continue
             mode = system_situations[svc]
-            if not self._dry_run(svc, mode):
+            if not self._dry_run(svc, mode, adaptation):
                 print(f"[ABORT] {svc} dry-run failed. Transaction aborted.")
                 return False
+        if self._out_of_time(expired):
+            return False
 
         print("\n[STEP 2] Backup & Apply changes...")
         for svc, adaptation in plan.items():
@@ -71,71 +158,51 @@ class Executor:
 
             mode = system_situations[svc]
             backups[svc] = self._backup(svc)
-            print(f"Executing adaptation for {svc}...")
-
-            if mode == "warning":
-                cpu_limits = adaptation["limits"]["cpu"]
-                memory_limits = adaptation["limits"]["memory"]
-                replica = adaptation["replica"]
-                command = (
-                    f"sh ./mapek/config.sh "
-                    f"cpu_limits={cpu_limits} memory_limits={memory_limits} "
-                    f"replica={replica} service={svc} mode={mode}"
-                )
-
-                res = self._run(command)
-                if res.returncode == 0:
-                    if cpu_limits != configs[svc]["limits"]["cpu"]:
-                        print(f"CPU is changed from {configs[svc]['limits']['cpu']} to {cpu_limits} for {svc}")
-                    if memory_limits != configs[svc]["limits"]["memory"]:
-                        print(f"Memory is changed from {configs[svc]['limits']['memory']} to {memory_limits} for {svc}")
-                    if replica != configs[svc]["replica"]:
-                        print(f"Replica is changed from {configs[svc]['replica']} to {replica} for {svc}")
-                    print(res.stdout)
-                else:
-                    success = False
-                    print(f"{svc}: Adaptation failed with error:")
-                    print(res.stderr)
-                    break
-            elif mode == "unhealthy":
-                cpu_requests = adaptation["requests"]["cpu"]
-                cpu_limits = adaptation["limits"]["cpu"]
-                memory_requests = adaptation["requests"]["memory"]
-                memory_limits = adaptation["limits"]["memory"]
-                replica = adaptation["replica"]
-                command = (
-                    f"sh ./mapek/config.sh "
-                    f"cpu_requests={cpu_requests} cpu_limits={cpu_limits} "
-                    f"memory_requests={memory_requests} memory_limits={memory_limits} "
-                    f"replica={replica} service={svc} mode={mode}"
-                )
-
-                res = self._run(command)
-                if res.returncode == 0:
-                    if cpu_limits != configs[svc]["limits"]["cpu"]:
-                        print(f"CPU is changed from {configs[svc]['limits']['cpu']} to {cpu_limits} for {svc}")
-                    if cpu_requests != configs[svc]["requests"]["cpu"]:
-                        print(f"CPU is changed from {configs[svc]['requests']['cpu']} to {cpu_requests} for {svc}")
-                    if memory_limits != configs[svc]["limits"]["memory"]:
-                        print(f"Memory is changed from {configs[svc]['limits']['memory']} to {memory_limits} for {svc}")
-                    if memory_requests != configs[svc]["requests"]["memory"]:
-                        print(f"Memory is changed from {configs[svc]['requests']['memory']} to {memory_requests} for {svc}")
-                    if replica != configs[svc]["replica"]:
-                        print(f"Replica is changed from {configs[svc]['replica']} to {replica} for {svc}")
-                    print(res.stdout)
-                else:
-                    success = False
-                    print(f"{svc}: Adaptation failed with error:")
-                    print(res.stderr)
-                    break
+            if not self._apply(svc, adaptation, mode, configs):
+                success = False
+                break
 
         if not success:
-            print("\n[STEP 3] Rolling back all previously modified services...")
-            for rollback_svc, backup_file in backups.items():
-                self._rollback(rollback_svc, backup_file)
-            print("[TRANSACTION][ABORTED] All changes reverted.")
+            self._rollback_all(backups)
+            return False
+
+        print("\n[STEP 3] All services successfully updated.")
+        print("[TRANSACTION][SUCCESS] Atomic adaptation completed.")
+        return True
+
+    def _execute_plan_parallel(self, plan, configs, system_situations, expired=None):
+        print("======== Starting Atomic Adaptation Transaction (parallel) ========")
+        targets = [svc for svc, adaptation in plan.items() if adaptation]
+        if not targets:
+            print("[TRANSACTION][SUCCESS] Nothing to adapt.")
+            return True
+        workers = min(self.max_workers, len(targets))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            print("\n[STEP 1] Dry-run verification for all services...")
+            dry_runs = {svc: pool.submit(self._dry_run, svc, system_situations[svc], plan[svc]) for svc in targets}
+            failed = [svc for svc, future in dry_runs.items() if not future.result()]
+            if failed:
+                print(f"[ABORT] {', '.join(failed)} dry-run failed. Transaction aborted.")
+                return False
+            if self._out_of_time(expired):
+                return False
+
+            print("\n[STEP 2] Backup & Apply changes...")
+            backup_futures = {svc: pool.submit(self._backup, svc) for svc in targets}
+            backups = {svc: future.result() for svc, future in backup_futures.items()}
+            applies = {
+                svc: pool.submit(self._apply, svc, plan[svc], system_situations[svc], configs)
+                for svc in targets
+            }
+            failed = [svc for svc, future in applies.items() if not future.result()]
+
+        if failed:
+            print(f"[ERROR] Adaptation failed for {', '.join(failed)}.")
+            # every service was touched, so all of them are restored
+            self._rollback_all(backups)
             return False
 
         print("\n[STEP 3] All services successfully updated.")
         print("[TRANSACTION][SUCCESS] Atomic adaptation completed.")
-        return True
\ No newline at end of file
+        return True
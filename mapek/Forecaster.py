@@ -0,0 +1,37 @@
+from collections import deque
+
+import numpy as np
+
+class HoltForecaster:
+    # Holt's linear trend (double exponential smoothing), parameters refitted on the recent history
+    def __init__(self, history=30, alphas=(0.2, 0.4, 0.6, 0.8), betas=(0.1, 0.3, 0.5)):
+        self.values = deque(maxlen=history)
+        grid = np.array([(a, b) for a in alphas for b in betas])
+        self.alphas = grid[:, 0]
+        self.betas = grid[:, 1]
+
+    def __len__(self):
+        return len(self.values)
+
+    def update(self, value):
+        self.values.append(float(value))
+
+    def forecast(self, horizon=1):
+        if not self.values:
+            return 0.0
+        if len(self.values) < 3:
+            return self.values[-1]
+
+        # run every (alpha, beta) pair side by side and keep the one with the lowest one-step error
+        series = np.array(self.values)
+        level = np.full(len(self.alphas), series[0])
+        trend = np.full(len(self.alphas), series[1] - series[0])
+        sse = np.zeros(len(self.alphas))
+        for value in series[1:]:
+            predicted = level + trend
+            sse += (value - predicted) ** 2
+            new_level = self.alphas * value + (1 - self.alphas) * predicted
+            trend = self.betas * (new_level - level) + (1 - self.betas) * trend
+            level = new_level
+        best = np.argmin(sse)
+        return max(0.0, float(level[best] + horizon * trend[best]))
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+
+# the outer stage wrappers, only they add up to the per-cycle totals, the calls inside them are in the histograms
+CYCLE_STAGES = {"monitor", "analyze", "plan", "execute"}
+
+HELP = {
+    "mapek_stage_duration_seconds": "Duration of a MAPE-K stage or of a single call inside it.",
+    "mapek_subprocess_duration_seconds": "Duration of shell commands run by the Executor.",
+    "mapek_reaction_seconds": "Time from the start of metric collection until the Executor returns.",
+    "mapek_rollout_ready_seconds": "Time from an applied adaptation until its new pods are all available.",
+    "mapek_fetch_failures_total": "Metric fetches that returned no data.",
+    "mapek_cycles_total": "Adaptation cycles run by the driver.",
+    "mapek_rollouts_suppressed_total": "Planned adaptations held back by the Stabilizer.",
+}
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+
+
+class Instrumentation:
+    def __init__(self, log_file="datasets/driver_metrics.jsonl", max_bytes=10 * 1024 * 1024, backups=3):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.server = None
+
+        # rolling JSON log, one record per cycle
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.cycle = {}
+
+    # ---------- recording ----------
+    def _key(self, name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            key = self._key(name, labels)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(DEFAULT_BUCKETS)
+            self.histograms[key].observe(value)
+            if name == "mapek_stage_duration_seconds" and labels.get("stage") in CYCLE_STAGES:
+                self.cycle[labels["stage"]] = self.cycle.get(labels["stage"], 0.0) + value
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            key = self._key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timed(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def wrap(self, obj, method_name, name="mapek_stage_duration_seconds", labels=None, on_result=None):
+        # replace obj.method_name with a timed version, labels may depend on the call arguments
+        method = getattr(obj, method_name)
+
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            call_labels = labels(*args, **kwargs) if callable(labels) else dict(labels or {})
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                self.observe(name, time.perf_counter() - start, **call_labels)
+            if on_result is not None:
+                on_result(result, *args, **kwargs)
+            return result
+
+        setattr(obj, method_name, timed_method)
+
+    # ---------- per-cycle log ----------
+    def begin_cycle(self):
+        with self.lock:
+            self.cycle = {}
+        return time.perf_counter()
+
+    def end_cycle(self, number, started, executed, **extra):
+        # reaction time only means something for cycles that reached the Executor
+        reaction = time.perf_counter() - started
+        if executed:
+            self.observe("mapek_reaction_seconds", reaction)
+        self.inc("mapek_cycles_total")
+        with self.lock:
+            record = {
+                "timestamp": time.time(),
+                "cycle": number,
+                "executed": executed,
+                "reaction_seconds": reaction if executed else None,
+                "stages": dict(self.cycle),
+                **extra
+            }
+        self._write_log(record)
+
+    def _write_log(self, record):
+        try:
+            directory = os.path.dirname(self.log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.log_file) and os.path.getsize(self.log_file) >= self.max_bytes:
+                for idx in range(self.backups - 1, 0, -1):
+                    if os.path.exists(f"{self.log_file}.{idx}"):
+                        os.replace(f"{self.log_file}.{idx}", f"{self.log_file}.{idx + 1}")
+                os.replace(self.log_file, f"{self.log_file}.1")
+            with open(self.log_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            print(f"[METRICS][ERROR] Failed to write {self.log_file}: {e}")
+
+    # ---------- exposition ----------
+    def _format_labels(self, labels, extra=None):
+        items = list(labels) + list(extra or [])
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    def render(self):
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        seen = set()
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            # counts are already cumulative, observe() fills every bucket above the value
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f"{name}_bucket{self._format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        instrumentation = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = instrumentation.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[METRICS] Serving driver metrics on http://{host}:{self.server.server_port}/metrics")
+        return self.server.server_port
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def instrument_components(instrumentation, monitor, analyzer, planner, executor):
+    def fetch_failed(result, id, aggregation):
+        if not result:
+            instrumentation.inc("mapek_fetch_failures_total", metric=id, aggregation=aggregation)
+
+    def batch_failed(result, metrics):
+        if result is None:
+            instrumentation.inc("mapek_fetch_failures_total", len(metrics), metric="batch", aggregation="batch")
+
+    def command_labels(command):
+        if "--dry-run" in command:
+            return {"command": "dry_run"}
+        if " rollback " in command:
+            return {"command": "rollback"}
+        return {"command": "apply"}
+
+    # tenants share one Monitor, it is only wrapped once
+    if monitor is not None:
+        instrumentation.wrap(monitor, "fetch_data_from_ibm", labels={"stage": "monitor_fetch"}, on_result=fetch_failed)
+        instrumentation.wrap(monitor, "fetch_batch_from_ibm", labels={"stage": "monitor_fetch_batch"}, on_result=batch_failed)
+        instrumentation.wrap(monitor, "collect", labels={"stage": "monitor"})
+    instrumentation.wrap(analyzer, "process_data", labels={"stage": "analyze"})
+    instrumentation.wrap(planner, "evaluate_services", labels={"stage": "plan"})
+    instrumentation.wrap(executor, "execute_plan", labels={"stage": "execute"})
+    instrumentation.wrap(executor, "_run", "mapek_subprocess_duration_seconds", labels=command_labels)
+    instrumentation.wrap(executor, "_backup", "mapek_subprocess_duration_seconds", labels={"command": "backup"})
@@ -1,12 +1,51 @@
 import json
 import os
+import atexit
+import time
+import threading
+
+def validate(data):
+    # problems that would break the Analyzer or Planner, an empty list means the file can be used
+    errors = []
+    try:
+        thresholds = data["thresholds"]
+        for metric in ["cpu", "memory"]:
+            if not thresholds[metric]["low"] < thresholds[metric]["high"]:
+                errors.append(f"thresholds.{metric}: low must be below high")
+        if thresholds["latency"]["avg"] <= 0 or thresholds["latency"]["max"] <= 0:
+            errors.append("thresholds.latency: avg and max must be positive")
+        if thresholds["error_rate"] <= 0:
+            errors.append("thresholds.error_rate must be positive")
+        float(thresholds["roi"])
+
+        weights = data["weights"]
+        values = [float(weights[key]) for key in ["cpu", "memory", "latency", "error_rate"]]
+        if min(values) < 0 or abs(sum(values) - 1) > 0.01:
+            errors.append("weights must be non-negative and sum to 1")
+
+        single = data["resources_limitations"]["single"]
+        for key in ["memory", "cpu", "replica"]:
+            if not 0 < single[f"min_{key}"] <= single[f"max_{key}"]:
+                errors.append(f"resources_limitations.single: min_{key} must be positive and not above max_{key}")
+    except (KeyError, TypeError, ValueError) as e:
+        errors.append(f"missing or malformed entry: {e}")
+    return errors
 
 class Knowledge:
 
-    def __init__(self, file_path = "./knowledge.json"):
+    def __init__(self, file_path = "./knowledge.json", write_delay=1.0):
         self.file_path = file_path
         self.data = self._load_json()
         self.last_modified = os.path.getmtime(file_path)
+        # bumped on every reload, components compare it to know when to refresh their policy
+        self.version = 0
+        self.lock = threading.Lock()
+        # set_* calls within write_delay seconds end up in one write
+        self.write_delay = write_delay
+        self.timer = None
+        self.watcher = None
+        # the Timer thread is a daemon, a write still waiting on it would be lost at exit
+        atexit.register(self._flush_pending)
 
     def _load_json(self):
         if not os.path.exists(self.file_path):
@@ -16,10 +55,37 @@ class Knowledge:
             return json.load(f)
     
     def _save_json(self):
-        with open(self.file_path, "w") as f:
-            json.dump(self.data, f, indent=2)
+        with self.lock:
+            if self.timer is None:
+                self.timer = threading.Timer(self.write_delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _flush_pending(self):
+        with self.lock:
+            pending = self.timer is not None
+        if pending:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            content = json.dumps(self.data, indent=2)
+            # readers of the file only ever see the old or the new content
+            tmp_file = f"{self.file_path}.tmp"
+            with open(tmp_file, "w") as f:
+                f.write(content)
+            os.replace(tmp_file, self.file_path)
+            self.last_modified = os.path.getmtime(self.file_path)
         print(f"Knowledge file updated: {self.file_path}")
 
+    def snapshot(self):
+        # version and data read together, a reload cannot slip in between
+        with self.lock:
+            return self.version, self.data
+
     def get(self):
         return {
             "thresholds": self.data.get("thresholds", {}),
@@ -32,6 +98,27 @@ class Knowledge:
     def get_weight(self):
         return self.data.get("weights", {})
 
+    def get_analysis(self):
+        return self.data.get("analysis", {})
+
+    def get_planning(self):
+        return self.data.get("planning", {})
+
+    def get_dependencies(self):
+        return self.data.get("dependencies", {})
+
+    def get_stabilization(self):
+        return self.data.get("stabilization", {})
+
+    def get_rollout(self):
+        return self.data.get("rollout", {})
+
+    def get_checkpoint(self):
+        return self.data.get("checkpoint", {})
+
+    def get_scheduler(self):
+        return self.data.get("scheduler", {})
+
     def get_resources(self):
         return self.data.get("resources", {})
 
@@ -63,6 +150,34 @@ class Knowledge:
 
     def reload_if_updated(self):
         modified = os.path.getmtime(self.file_path)
-        if modified != self.last_modified:
-            self.data = self._load_json()
-            self.last_modified = modified
\ No newline at end of file
+        if modified == self.last_modified:
+            return False
+        self.last_modified = modified
+        try:
+            data = self._load_json()
+        except ValueError as e:
+            print(f"[KNOWLEDGE][ERROR] {self.file_path} is not valid JSON, keeping the current policy: {e}")
+            return False
+        errors = validate(data)
+        if errors:
+            print(f"[KNOWLEDGE][ERROR] Rejected {self.file_path}, keeping the current policy: {'; '.join(errors)}")
+            return False
+        with self.lock:
+            self.data = data
+            self.version += 1
+        print(f"[KNOWLEDGE] Reloaded {self.file_path} (version {self.version})")
+        return True
+
+    def watch(self, interval=5):
+        # mtime polling on a background thread, the MAPE-K loop only picks up the parsed result
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_if_updated()
+                except OSError as e:
+                    print(f"[KNOWLEDGE][WARNING] Failed to check {self.file_path}: {e}")
+
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=poll, name="knowledge-watcher", daemon=True)
+            self.watcher.start()
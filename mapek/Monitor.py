@@ -1,20 +1,59 @@
 import os
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from sdcclient import IbmAuthHelper, SdMonitorClient
 
 class Monitor:
-    def __init__(self, url, api_key, guid, sleep):
+    def __init__(self, url, api_key, guid, sleep, max_workers=4, mode="concurrent", batch_size=20, archive=None, namespaces=None):
         ibm_headers = IbmAuthHelper.get_headers(url, api_key, guid)
         self.sdclient = SdMonitorClient(sdc_url=url, custom_headers=ibm_headers)
         self.START = -sleep
         self.END = 0
         self.SAMPLING = 10
-        self.FILTER = 'kube_namespace_name="acmeair-group6"'
+        self.namespaces = namespaces or ["acmeair-group6"]
+        if len(self.namespaces) == 1:
+            self.FILTER = f'kube_namespace_name="{self.namespaces[0]}"'
+            self.segments = [{"id": "kubernetes.deployment.name"}]
+        else:
+            # every namespace in the same queries, samples are keyed "namespace/deployment"
+            names = ", ".join(f'"{namespace}"' for namespace in self.namespaces)
+            self.FILTER = f'kube_namespace_name in ({names})'
+            self.segments = [{"id": "kubernetes.namespace.name"}, {"id": "kubernetes.deployment.name"}]
+        # upper bound of concurrent get_data requests in fetch_all
+        self.max_workers = max(1, max_workers)
+        # "concurrent": one request per metric, "batch": many metrics per request
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        # RawArchive keeping every response, written off the hot path
+        self.archive = archive
+
+    def set_window(self, start_ts, end_ts):
+        # absolute window in epoch seconds, replaces the relative [-sleep, now] window
+        self.START = int(start_ts)
+        self.END = int(end_ts)
+
+    def _save_raw(self, id, aggregation, res):
+        if self.archive is not None:
+            self.archive.append(id, aggregation, res)
+            return
+        if not os.path.exists('datasets/raw'):
+            os.makedirs('datasets/raw', exist_ok=True)
+        filename = "datasets/raw/" + id.replace(".", "_") + "_" + aggregation + "_metric.json"
+        with open(filename, "w") as outfile:
+            json.dump(res, outfile)
+
+    def _merge_segments(self, res):
+        # [namespace, deployment, values...] -> ["namespace/deployment", values...]
+        if len(self.segments) == 1:
+            return res
+        merged = {key: value for key, value in res.items() if key != "data"}
+        merged["data"] = [{"t": e["t"], "d": [f"{e['d'][0]}/{e['d'][1]}"] + e["d"][2:]} for e in res.get("data", [])]
+        return merged
 
     def fetch_data_from_ibm(self, id, aggregation):
-        metric = [
-            {"id": "kubernetes.deployment.name"},  # segmentation by deployment
+        metric = self.segments + [
             {"id": id, "aggregations": {"time": aggregation, "group": "avg"}}
         ]
         try:
@@ -28,13 +67,127 @@ class Monitor:
             if not ok:
                 print(f"Error fetching {id}: {res}")
                 return None
+            res = self._merge_segments(res)
             # Save raw JSON
-            if not os.path.exists('datasets/raw'):
-                os.makedirs('datasets/raw')
-            filename = "datasets/raw/" + id.replace(".", "_") + "_" + aggregation + "_metric.json"
-            with open(filename, "w") as outfile:
-                json.dump(res, outfile)
+            self._save_raw(id, aggregation, res)
             return res
         except Exception as e:
             print(f"Exception occurred while fetching {id}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def fetch_batch_from_ibm(self, metrics):
+        # one request for all metrics, every sample is [deployment, value_1, ..., value_n]
+        metric = self.segments + [
+            {"id": id, "aggregations": {"time": aggregation, "group": "avg"}}
+            for id, aggregation in metrics
+        ]
+        try:
+            ok, res = self.sdclient.get_data(
+                metrics=metric,
+                start_ts=self.START,
+                end_ts=self.END,
+                sampling_s=self.SAMPLING,
+                filter=self.FILTER
+            )
+            if not ok:
+                print(f"Error fetching batch of {len(metrics)} metrics: {res}")
+                return None
+            res = self._merge_segments(res)
+        except Exception as e:
+            print(f"Exception occurred while fetching batch of {len(metrics)} metrics: {e}")
+            return None
+
+        # split the response back into one single-metric response per (metric, aggregation)
+        results = {}
+        for idx, (id, aggregation) in enumerate(metrics, start=1):
+            single = {key: value for key, value in res.items() if key != "data"}
+            single["data"] = [{"t": e["t"], "d": [e["d"][0], e["d"][idx]]} for e in res.get("data", [])]
+            self._save_raw(id, aggregation, single)
+            results[(id, aggregation)] = single
+        return results
+
+    def _gather(self, pool, futures, timeout):
+        # wait at most timeout seconds, requests still in flight are abandoned to their threads
+        _, pending = wait(futures, timeout=timeout)
+        pool.shutdown(wait=False, cancel_futures=True)
+        return pending
+
+    def fetch_all(self, metrics, timeout=None):
+        # fetch every (metric, aggregation) pair concurrently, at most max_workers in flight
+        workers = min(self.max_workers, len(metrics)) or 1
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = [(metric, agg, pool.submit(self.fetch_data_from_ibm, metric, agg)) for metric, agg in metrics]
+        pending = self._gather(pool, [future for _, _, future in futures], timeout)
+
+        # keep the same order as the requested metrics
+        data_dict = {}
+        for metric, agg, future in futures:
+            if future in pending:
+                print(f"Timed out fetching {metric} with {agg} aggregation")
+                continue
+            res = future.result()
+            if res:
+                data_dict[(metric, agg)] = res
+            else:
+                print(f"Failed to fetch {metric} with {agg} aggregation")
+        return data_dict
+
+    def fetch_all_batched(self, metrics, timeout=None):
+        # pack the metrics into as few requests as possible, batches are sent concurrently
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        batches = [metrics[i:i + self.batch_size] for i in range(0, len(metrics), self.batch_size)]
+        workers = min(self.max_workers, len(batches)) or 1
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = [(batch, pool.submit(self.fetch_batch_from_ibm, batch)) for batch in batches]
+        pending = self._gather(pool, [future for _, future in futures], timeout)
+
+        data_dict = {}
+        for batch, future in futures:
+            if future in pending:
+                print(f"Timed out fetching batch of {len(batch)} metrics")
+                continue
+            results = future.result()
+            if results is None:
+                # fall back to one request per metric for this batch, within what is left of the timeout
+                print(f"Batch query failed, fetching {len(batch)} metrics one by one")
+                remaining = max(deadline - time.monotonic(), 0) if deadline is not None else None
+                data_dict.update(self.fetch_all(batch, remaining))
+                continue
+            data_dict.update(results)
+        return data_dict
+
+    def collect(self, metrics, timeout=None):
+        # timeout: seconds left of the monitor budget, metrics not fetched by then are missing from this cycle
+        if self.mode == "batch":
+            return self.fetch_all_batched(metrics, timeout)
+        return self.fetch_all(metrics, timeout)
+
+    def fetch_history(self, metrics, start_ts, end_ts, period):
+        # one batched query over the whole range, its samples are cut into cycles of `period` seconds
+        window = self.START, self.END
+        self.set_window(start_ts, end_ts)
+        try:
+            data_dict = self.fetch_all_batched(metrics)
+        finally:
+            self.START, self.END = window
+
+        cycles = {}
+        for key, res in data_dict.items():
+            for e in res.get("data", []):
+                bucket = int((e["t"] - start_ts) // period)
+                cycles.setdefault(bucket, {}).setdefault(key, {"data": []})["data"].append(e)
+        return [cycles[bucket] for bucket in sorted(cycles)]
+
+    def split_namespaces(self, data_dict):
+        # one data_dict per namespace, in the single-namespace format the Analyzer reads
+        if len(self.segments) == 1:
+            return {self.namespaces[0]: data_dict}
+        split = {namespace: {} for namespace in self.namespaces}
+        for key, res in data_dict.items():
+            for e in res.get("data", []):
+                namespace, _, deployment = e["d"][0].partition("/")
+                if namespace in split:
+                    split[namespace].setdefault(key, {"data": []})["data"].append(
+                        {"t": e["t"], "d": [deployment] + e["d"][1:]}
+                    )
+        return split
@@ -1,7 +1,77 @@
 import copy
+import math
+import itertools
+
+from mapek.Analyzer import LATENCY_HIGH
+from mapek.Forecaster import HoltForecaster
+from mapek.Dependencies import DependencyGraph
+from mapek.RollingStats import RollingStats
+from mapek.UtilityModel import UtilityModel
+
+FIXED_STEPS = {"cpu": 250, "memory": 256}
+# allocations are rounded to these units
+GRANULARITY = {"cpu": 50, "memory": 64}
 
 class Planner:
-    def __init__(self, service_to_use, resources_limitations, resources, roi):
+    def __init__(self, service_to_use, resources_limitations, roi, planning=None, thresholds=None, dependencies=None, weights=None):
+        planning = planning or {}
+        thresholds = thresholds or {}
+        dependencies = dependencies or {}
+        self.set_policy(resources_limitations, roi, thresholds)
+
+        # "service" accepts each action on its ROI, "global" picks the best set under the total budget
+        self.budget_mode = planning.get("budget", "service")
+        self.gains = {}
+
+        # "reactive" acts on breaches, "predictive" also scales ahead of forecast load
+        self.mode = planning.get("mode", "reactive")
+        forecast = planning.get("forecast", {})
+        self.forecast_horizon = forecast.get("horizon", 1)
+        self.target_utilization = forecast.get("target_utilization", 60)
+        self.forecast_keys = ["request_per_second", "cpu", "latency_avg"]
+        self.forecasters = {
+            svc: {key: HoltForecaster(forecast.get("history", 30)) for key in self.forecast_keys}
+            for svc in service_to_use
+        }
+
+        # "fixed" moves by FIXED_STEPS, "proportional" sizes from utilization / target
+        steps = planning.get("steps", {})
+        self.step_policy = steps.get("policy", "fixed")
+        self.step_targets = {"cpu": 60, "memory": 60, **steps.get("target", {})}
+        self.damping = steps.get("damping", 0.8)
+        self.cooldown = steps.get("cooldown", 2)
+        # requests per second one replica serves at the CPU target, learned when not configured
+        self.replica_throughput = steps.get("replica_throughput")
+        self.throughput = {svc: RollingStats(10, "ewma") for svc in service_to_use}
+        self.cycle = 0
+        self.last_step = {svc: {} for svc in service_to_use}
+
+        # learned utility change of an action, replaces the benefit formula once trained
+        roi_model = planning.get("roi_model", {})
+        self.utility_model = None
+        if roi_model.get("enabled", False):
+            self.utility_model = UtilityModel(
+                thresholds,
+                weights,
+                roi_model.get("forgetting", 0.995),
+                roi_model.get("min_samples", 60),
+                roi_model.get("history_file"),
+                roi_model.get("flush_interval", 300)
+            )
+        self.previous = {}
+
+        # latency of a caller is attributed to the degraded services it depends on
+        self.dependencies = DependencyGraph(
+            service_to_use,
+            dependencies.get("graph"),
+            dependencies.get("mode", "declared"),
+            dependencies.get("history", 30),
+            dependencies.get("min_correlation", 0.7)
+        )
+
+    def set_policy(self, resources_limitations, roi, thresholds=None):
+        # called between cycles on a knowledge reload, forecasters and learned state are kept
+        thresholds = thresholds or {}
         self.min_replica = resources_limitations["single"]["min_replica"]
         self.max_replica = resources_limitations["single"]["max_replica"]
         self.min_cpu = resources_limitations["single"]["min_cpu"]
@@ -9,6 +79,90 @@ class Planner:
         self.min_memory = resources_limitations["single"]["min_memory"]
         self.max_memory = resources_limitations["single"]["max_memory"]
         self.roi_threshold = roi
+        total = resources_limitations.get("total", {})
+        self.budget = (total.get("cpu", math.inf), total.get("memory", math.inf), total.get("replica", math.inf))
+        self.cpu_threshold_high = thresholds.get("cpu", {}).get("high", 80)
+        self.latency_threshold = thresholds.get("latency", {}).get("avg", 150)
+
+    def checkpoint(self):
+        return {
+            "cycle": self.cycle,
+            "last_step": self.last_step,
+            "forecasts": {
+                svc: {key: list(forecaster.values) for key, forecaster in forecasters.items()}
+                for svc, forecasters in self.forecasters.items()
+            },
+            "throughput": {svc: stats.state() for svc, stats in self.throughput.items()}
+        }
+
+    def restore(self, state):
+        self.cycle = state.get("cycle", 0)
+        for svc, steps in state.get("last_step", {}).items():
+            if svc in self.last_step:
+                self.last_step[svc] = steps
+        for svc, forecasts in state.get("forecasts", {}).items():
+            for key, values in forecasts.items():
+                if key in self.forecasters.get(svc, {}):
+                    for value in values:
+                        self.forecasters[svc][key].update(value)
+        for svc, stats_state in state.get("throughput", {}).items():
+            if svc in self.throughput:
+                self.throughput[svc] = RollingStats(10, "ewma")
+                self.throughput[svc].restore(stats_state)
+
+    def _cooling_down(self, svc, resource):
+        last = self.last_step[svc].get(resource)
+        return last is not None and self.cycle - last <= self.cooldown
+
+    def _step(self, svc, resource, limit, utilization):
+        # size of the next vertical change of a resource limit
+        if self.step_policy != "proportional":
+            return FIXED_STEPS[resource]
+        if self._cooling_down(svc, resource):
+            print(f"{svc}: {resource} in cooldown, keeping its limit")
+            return 0
+        desired = limit * utilization / self.step_targets[resource]
+        step = abs(desired - limit) * self.damping
+        return math.ceil(step / GRANULARITY[resource]) * GRANULARITY[resource]
+
+    def _learn_throughput(self, svc, analysis_result):
+        # throughput per replica, scaled to the CPU target; saturated cycles would underestimate it
+        replicas = analysis_result.get("replicas", 0)
+        rps = analysis_result["request_per_second"]
+        cpu = analysis_result["cpu"]
+        if replicas > 0 and rps > 0 and 0 < cpu <= self.cpu_threshold_high:
+            self.throughput[svc].append(rps / replicas * self.step_targets["cpu"] / cpu)
+
+    def _replica_target(self, svc, analysis_result, replica, direction):
+        if self.step_policy != "proportional":
+            return replica + direction
+        if self._cooling_down(svc, "replica"):
+            print(f"{svc}: replica in cooldown, keeping its count")
+            return replica
+
+        rps = analysis_result["request_per_second"]
+        throughput = self.replica_throughput or (self.throughput[svc].smoothed() if len(self.throughput[svc]) else None)
+        if throughput:
+            desired = math.ceil(rps / throughput)
+        else:
+            replicas = analysis_result.get("replicas") or replica
+            desired = math.ceil(replicas * analysis_result["cpu"] / self.step_targets["cpu"])
+        step = math.ceil(max(direction * (desired - replica), 0) * self.damping)
+        # at least one replica in the requested direction
+        return replica + direction * max(step, 1)
+
+    def commit(self, decisions, current_configs):
+        # called once the decisions are applied, a plan that was filtered out or failed starts no cooldown
+        for svc, decision in decisions.items():
+            if decision:
+                self._record_steps(svc, current_configs[svc], decision)
+
+    def _record_steps(self, svc, config, new_config):
+        for resource in ["cpu", "memory"]:
+            if config["limits"][resource] != new_config["limits"][resource]:
+                self.last_step[svc][resource] = self.cycle
+        if config["replica"] != new_config["replica"]:
+            self.last_step[svc]["replica"] = self.cycle
     
     def _decide_action(self, analysis_result, config, svc):
         if not analysis_result or "adaptation" not in analysis_result:
@@ -28,14 +182,45 @@ class Planner:
             return None, None
         ## When system situation is warning
         elif system_situation == "warning":
-            new_config = self._adopt_warning_situation(analysis_result["unhealthy_metrics"], new_config, adaptations, svc)
+            new_config = self._adopt_warning_situation(analysis_result["unhealthy_metrics"], new_config, adaptations, svc, analysis_result)
         ## When system situation is unhealthy
         elif system_situation == "unhealthy":
-            new_config = self._adopt_unhealthy_situation(analysis_result["unhealthy_metrics"], new_config, adaptations, svc)
+            new_config = self._adopt_unhealthy_situation(analysis_result["unhealthy_metrics"], new_config, adaptations, svc, analysis_result)
 
         print(config)
         print(new_config)
 
+        benefit, total_cost, roi, predicted_utility = self._score(config, new_config, overall_utility)
+        if self.utility_model and self.utility_model.ready and new_config != config:
+            benefit = self.utility_model.benefit(analysis_result, config, new_config)
+            predicted_utility = min(1.0, overall_utility + benefit)
+            print(f"{svc} learned utility change: {benefit:+.3f}")
+            if all(new <= old for new, old in zip(self._usage(new_config), self._usage(config))):
+                # a scale-down returns resources, its return is what it frees per utility it costs
+                roi = total_cost / max(-benefit, 1e-6)
+            elif benefit <= 0:
+                print(f"Skipping adaptation for {svc} (no predicted utility gain)")
+                return None, None
+            else:
+                roi = benefit / (total_cost + 1e-6)
+        self.gains[svc] = predicted_utility - overall_utility
+
+        print(f"{svc} Utility={benefit:.3f}, Cost={total_cost:.3f}, ROI={roi:.2f}")
+
+        if roi == 0:
+            print(f"Skipping adaptation for {svc} (Don't have any change between old and new config)")
+            return None, None
+        elif roi < self.roi_threshold and self.budget_mode == "global" and benefit > 0:
+            print(f"Leaving adaptation for {svc} to the budget optimizer (ROI: {roi:.2f})")
+            return system_situation, new_config
+        elif roi < self.roi_threshold:
+            print(f"Skipping adaptation for {svc} (ROI too low: {roi:.2f})")
+            return None, None
+        else:
+            print(f"Proceeding with adaptation for {svc} (ROI: {roi:.2f})")
+            return system_situation, new_config
+
+    def _score(self, config, new_config, overall_utility):
         old_cpu = (config["requests"]["cpu"] + config["limits"]["cpu"]) / 2
         new_cpu = (new_config["requests"]["cpu"] + new_config["limits"]["cpu"]) / 2
         old_memory = (config["requests"]["memory"] + config["limits"]["memory"]) / 2
@@ -55,27 +240,129 @@ class Planner:
         predicted_utility = min(1.0, overall_utility + benefit)
         # calculate roi
         roi = abs(benefit) / (total_cost + 1e-6)
-        
+        return benefit, total_cost, roi, predicted_utility
 
-        print(f"{svc} Utility={benefit:.3f}, Cost={total_cost:.3f}, ROI={roi:.2f}")
+    def _learn_utility(self, analysis_results, current_configs):
+        # current_configs holds what was applied after the previous analyzed cycle
+        for svc, result in analysis_results.items():
+            if svc in self.previous:
+                previous_result, previous_config = self.previous[svc]
+                self.utility_model.update(previous_result, previous_config, current_configs[svc], result)
+            self.previous[svc] = (result, copy.deepcopy(current_configs[svc]))
 
-        if roi == 0:
-            print(f"Skipping adaptation for {svc} (Don't have any change between old and new config)")
-            return None, None
-        elif roi < self.roi_threshold:
-            print(f"Skipping adaptation for {svc} (ROI too low: {roi:.2f})")
-            return None, None
+    def _usage(self, config):
+        return (
+            config["limits"]["cpu"] * config["replica"],
+            config["limits"]["memory"] * config["replica"],
+            config["replica"]
+        )
+
+    def _fit_budget(self, decisions, current_configs):
+        # changes that free or keep resources always fit, they only leave more room
+        usage = [sum(values) for values in zip(*(self._usage(config) for config in current_configs.values()))]
+        scale_ups = []
+        for svc, new_config in decisions.items():
+            if not new_config:
+                continue
+            delta = [new - old for new, old in zip(self._usage(new_config), self._usage(current_configs[svc]))]
+            if any(d > 0 for d in delta):
+                scale_ups.append((svc, delta, self.gains.get(svc, 0.0)))
+            else:
+                usage = [u + d for u, d in zip(usage, delta)]
+
+        def fits(selection):
+            total = [u + sum(delta[idx] for _, delta, _ in selection) for idx, u in enumerate(usage)]
+            return all(t <= b for t, b in zip(total, self.budget))
+
+        if len(scale_ups) <= 10:
+            # few services, every subset can be checked: highest total gain, then the smallest footprint
+            best = []
+            for size in range(1, len(scale_ups) + 1):
+                for selection in itertools.combinations(scale_ups, size):
+                    if not fits(selection):
+                        continue
+                    key = (sum(gain for _, _, gain in selection), -len(selection))
+                    if not best or key > (sum(gain for _, _, gain in best), -len(best)):
+                        best = list(selection)
         else:
-            print(f"Proceeding with adaptation for {svc} (ROI: {roi:.2f})")
-            return system_situation, new_config
+            # greedy on gain per share of the budget consumed
+            def density(item):
+                share = max(d / b for d, b in zip(item[1], self.budget) if b and d > 0)
+                return item[2] / share if share else math.inf
+            best = []
+            for item in sorted(scale_ups, key=density, reverse=True):
+                if fits(best + [item]):
+                    best.append(item)
+
+        accepted = {svc for svc, _, _ in best}
+        rejected = [svc for svc, _, _ in scale_ups if svc not in accepted]
+        for svc in rejected:
+            print(f"Skipping adaptation for {svc} (does not fit the cluster budget)")
+        return rejected
 
 
-    def evaluate_services(self, analysis_results, current_configs):
+    def observe(self, observations):
+        for svc, values in observations.items():
+            # warm-up samples would teach the forecasters a transient
+            if svc in self.forecasters and not values.get("warming"):
+                for key in self.forecast_keys:
+                    self.forecasters[svc][key].update(values[key])
+
+    def _forecast_action(self, svc, config, observation):
+        forecasters = self.forecasters[svc]
+        if len(forecasters["cpu"]) < 3:
+            return None
+
+        cpu_forecast = forecasters["cpu"].forecast(self.forecast_horizon)
+        rps_forecast = forecasters["request_per_second"].forecast(self.forecast_horizon)
+        latency_forecast = forecasters["latency_avg"].forecast(self.forecast_horizon)
+        # CPU expected at the forecast load, from its own trend or scaled with the request rate
+        cpu_expected = cpu_forecast
+        if observation["request_per_second"] > 0:
+            cpu_expected = max(cpu_expected, observation["cpu"] * rps_forecast / observation["request_per_second"])
+        print(f"{svc} forecast: RPS={rps_forecast:.2f}, CPU={cpu_expected:.2f}%, Latency={latency_forecast:.2f} ms")
+
+        latency_breach = latency_forecast > self.latency_threshold and cpu_expected > self.target_utilization
+        if cpu_expected <= self.cpu_threshold_high and not latency_breach:
+            return None
+
+        # size the allocation so that the forecast demand runs at the target utilization
+        demand = cpu_expected / 100 * config["limits"]["cpu"] * config["replica"]
+        required = demand / (self.target_utilization / 100)
+        replica = config["replica"]
+        if required / replica > self.max_cpu:
+            replica = min(math.ceil(required / self.max_cpu), self.max_replica)
+        cpu_limit = min(max(math.ceil(required / replica / 50) * 50, config["limits"]["cpu"]), self.max_cpu)
+
+        new_config = copy.deepcopy(config)
+        new_config["limits"]["cpu"] = cpu_limit
+        new_config["replica"] = max(replica, config["replica"])
+        if new_config == config:
+            return None
+        return new_config
+
+    def evaluate_services(self, analysis_results, current_configs, observations=None):
         decisions = {}
         new_configs = current_configs.copy()
         system_situations = {}
+        self.cycle += 1
+        self.gains = {}
+        if self.utility_model:
+            self._learn_utility(analysis_results, current_configs)
+
+        if observations:
+            self.dependencies.update(observations)
+        attribution = self.dependencies.attribute(analysis_results)
+        root_causes = set().union(*attribution.values())
         
-        for svc, result in analysis_results.items():
+        # root causes are planned first
+        for svc in sorted(analysis_results, key=lambda svc: svc not in root_causes):
+            result = analysis_results[svc]
+            self._learn_throughput(svc, result)
+            if svc in attribution and not result["unhealthy_metrics"] & {"cpu_high", "memory_high"}:
+                # not saturated itself, so its latency is not a reason to scale it
+                print(f"{svc}: latency attributed to {', '.join(sorted(attribution[svc]))}")
+                result = {**result, "unhealthy_metrics": result["unhealthy_metrics"] - LATENCY_HIGH}
             system_situation, new_config = self._decide_action(result, current_configs[svc], svc)
             if new_config:
                 decisions[svc] = new_config
@@ -83,81 +370,117 @@ class Planner:
                 system_situations[svc] = system_situation
             else:
                 decisions[svc] = None
-        
+
+        if self.mode == "predictive" and observations:
+            self.observe(observations)
+            for svc, observation in observations.items():
+                # the forecast was measured against the old limits, sizing from it would ratchet during warm-up
+                if svc not in current_configs or observation.get("warming"):
+                    continue
+                proactive = self._forecast_action(svc, current_configs[svc], observation)
+                if proactive is None:
+                    continue
+                reactive = decisions.get(svc)
+                if reactive:
+                    # keep the reactive change, but never below the forecast sizing
+                    proactive_config = proactive
+                    proactive = copy.deepcopy(reactive)
+                    proactive["limits"]["cpu"] = max(reactive["limits"]["cpu"], proactive_config["limits"]["cpu"])
+                    proactive["replica"] = max(reactive["replica"], proactive_config["replica"])
+                else:
+                    system_situations[svc] = "warning"
+                print(f"Proactive adaptation for {svc}: CPU limit {proactive['limits']['cpu']}, replica {proactive['replica']}")
+                decisions[svc] = proactive
+                new_configs[svc] = proactive
+                utility = analysis_results[svc]["overall_utility"] if svc in analysis_results else 0.0
+                self.gains[svc] = self._score(current_configs[svc], proactive, utility)[3] - utility
+
+        if self.budget_mode == "global":
+            for svc in self._fit_budget(decisions, current_configs):
+                decisions[svc] = None
+                new_configs[svc] = current_configs[svc]
+                system_situations.pop(svc, None)
+
         return decisions, new_configs, system_situations
 
-    def _adopt_warning_situation(self, unhealthy_metrics, new_config, adaptations, svc):
+    def _adopt_warning_situation(self, unhealthy_metrics, new_config, adaptations, svc, analysis_result):
+        cpu_step = self._step(svc, "cpu", new_config["limits"]["cpu"], analysis_result["cpu"])
+        memory_step = self._step(svc, "memory", new_config["limits"]["memory"], analysis_result["memory"])
+
         ## Vertical Scale Up & Scale Down
         # situation of increasing cpu
-        if "cpu_high" in unhealthy_metrics and "latency_avg_high" in unhealthy_metrics:
-            new_config["limits"]["cpu"] = min(new_config["limits"]["cpu"] + 250, self.max_cpu)
+        if "cpu_high" in unhealthy_metrics and LATENCY_HIGH & unhealthy_metrics:
+            new_config["limits"]["cpu"] = min(new_config["limits"]["cpu"] + cpu_step, self.max_cpu)
             adaptations.append("increase_cpu")
 
         # situation of increasing memory
         if "memory_high" in unhealthy_metrics:
-            new_config["limits"]["memory"] = min(new_config["limits"]["memory"] + 256, self.max_memory)
+            new_config["limits"]["memory"] = min(new_config["limits"]["memory"] + memory_step, self.max_memory)
             adaptations.append("increase_memory")
 
         # situation of decreasing CPU
         if "cpu_low" in unhealthy_metrics:
-            new_config["limits"]["cpu"] = max(new_config["limits"]["cpu"] - 250, self.min_cpu)
+            new_config["limits"]["cpu"] = max(new_config["limits"]["cpu"] - cpu_step, self.min_cpu)
             adaptations.append("decrease_cpu")
         
         # situation of decreasing memory
         if "memory_low" in unhealthy_metrics:
-            new_config["limits"]["memory"] = max(new_config["limits"]["memory"] - 256, self.min_memory)
+            new_config["limits"]["memory"] = max(new_config["limits"]["memory"] - memory_step, self.min_memory)
             adaptations.append("decrease_memory")
 
         ## Horizontal Scale Up & Scale Down
         # situation of increasing replica
         if ((new_config["limits"]["cpu"] >= self.max_cpu or new_config["limits"]["memory"] >= self.max_memory) and 
-            ("latency_avg_high" in unhealthy_metrics or "error_rate_high" in unhealthy_metrics)):
-            new_config["replica"] = min(new_config["replica"] + 1, self.max_replica)
+            (LATENCY_HIGH & unhealthy_metrics or "error_rate_high" in unhealthy_metrics)):
+            new_config["replica"] = min(self._replica_target(svc, analysis_result, new_config["replica"], 1), self.max_replica)
             adaptations.append("increase_replica")
 
         # situation of decreasing replica
         if "cpu_low" in unhealthy_metrics and "memory_low" in unhealthy_metrics:
-            new_config["replica"] = max(new_config["replica"] - 1, self.min_replica)
+            new_config["replica"] = max(self._replica_target(svc, analysis_result, new_config["replica"], -1), self.min_replica)
             adaptations.append("decrease_replica")
         
         return new_config
 
-    def _adopt_unhealthy_situation(self, unhealthy_metrics, new_config, adaptations, svc):
+    def _adopt_unhealthy_situation(self, unhealthy_metrics, new_config, adaptations, svc, analysis_result):
+        cpu_step = self._step(svc, "cpu", new_config["limits"]["cpu"], analysis_result["cpu"])
+        memory_step = self._step(svc, "memory", new_config["limits"]["memory"], analysis_result["memory"])
+
         ## Vertical Scale Up & Scale Down
         # situation of increasing cpu
-        if "cpu_high" in unhealthy_metrics and "latency_avg_high" in unhealthy_metrics:
-            new_config["requests"]["cpu"] = min(new_config["requests"]["cpu"] + 250, self.max_cpu)
-            new_config["limits"]["cpu"] = min(new_config["limits"]["cpu"] + 250, self.max_cpu)
+        if "cpu_high" in unhealthy_metrics and LATENCY_HIGH & unhealthy_metrics:
+            new_config["requests"]["cpu"] = min(new_config["requests"]["cpu"] + cpu_step, self.max_cpu)
+            new_config["limits"]["cpu"] = min(new_config["limits"]["cpu"] + cpu_step, self.max_cpu)
             adaptations.append("increase_cpu")
 
         # situation of increasing memory
         if "memory_high" in unhealthy_metrics:
-            new_config["requests"]["memory"] = min(new_config["requests"]["memory"] + 256, self.max_memory)
-            new_config["limits"]["memory"] = min(new_config["limits"]["memory"] + 256, self.max_memory)
+            new_config["requests"]["memory"] = min(new_config["requests"]["memory"] + memory_step, self.max_memory)
+            new_config["limits"]["memory"] = min(new_config["limits"]["memory"] + memory_step, self.max_memory)
             adaptations.append("increase_memory")
 
         # situation of decreasing CPU
         if "cpu_low" in unhealthy_metrics:
-            new_config["requests"]["cpu"] = max(new_config["requests"]["cpu"] - 250, self.min_cpu)
-            new_config["limits"]["cpu"] = max(new_config["limits"]["cpu"] - 250, self.min_cpu)
+            new_config["requests"]["cpu"] = max(new_config["requests"]["cpu"] - cpu_step, self.min_cpu)
+            new_config["limits"]["cpu"] = max(new_config["limits"]["cpu"] - cpu_step, self.min_cpu)
             adaptations.append("decrease_cpu")
         
         # situation of decreasing memory
         if "memory_low" in unhealthy_metrics:
-            new_config["requests"]["memory"] = max(new_config["requests"]["memory"] - 256, self.min_memory)
-            new_config["limits"]["memory"] = max(new_config["limits"]["memory"] - 256, self.min_memory)
+            new_config["requests"]["memory"] = max(new_config["requests"]["memory"] - memory_step, self.min_memory)
+            new_config["limits"]["memory"] = max(new_config["limits"]["memory"] - memory_step, self.min_memory)
             adaptations.append("decrease_memory")
 
         ## Horizontal Scale Up & Scale Down
         # situation of increasing replica
-        if (("latency_avg_high" in unhealthy_metrics or "error_rate_high" in unhealthy_metrics) and 
+        if ((LATENCY_HIGH & unhealthy_metrics or "error_rate_high" in unhealthy_metrics) and 
             ("cpu_high" in unhealthy_metrics or "memory_high" in unhealthy_metrics)):
-            new_config["replica"] = min(new_config["replica"] + 1, self.max_replica)
+            new_config["replica"] = min(self._replica_target(svc, analysis_result, new_config["replica"], 1), self.max_replica)
             adaptations.append("increase_replica")
 
         # situation of decreasing replica
         if "cpu_low" in unhealthy_metrics and "memory_low" in unhealthy_metrics:
-            new_config["replica"] = max(new_config["replica"] - 1, self.min_replica)
+            new_config["replica"] = max(self._replica_target(svc, analysis_result, new_config["replica"], -1), self.min_replica)
             adaptations.append("decrease_replica")
         
         return new_config
\ No newline at end of file
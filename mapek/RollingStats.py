@@ -0,0 +1,92 @@
+from collections import deque
+
+class RollingStats:
+    def __init__(self, window_size=5, smoothing="sma", alpha=0.3):
+        self.window_size = max(1, int(window_size))
+        self.smoothing = smoothing
+        self.alpha = alpha
+
+        self.values = deque()
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.ewma = None
+        self.updates = 0
+        # monotonic queues of (update index, value) for the window min/max
+        self._min = deque()
+        self._max = deque()
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        value = float(value)
+        idx = self.updates
+        self.updates += 1
+
+        self.values.append(value)
+        self.sum += value
+        self.sum_sq += value * value
+        if len(self.values) > self.window_size:
+            old = self.values.popleft()
+            self.sum -= old
+            self.sum_sq -= old * old
+
+        # running sums drift with float error, refresh them once in a while (amortized O(1))
+        if self.updates % max(1024, self.window_size) == 0:
+            self.sum = sum(self.values)
+            self.sum_sq = sum(v * v for v in self.values)
+
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            self.ewma = self.alpha * value + (1 - self.alpha) * self.ewma
+
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((idx, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((idx, value))
+        oldest = idx - self.window_size
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+
+    def mean(self):
+        return self.sum / len(self.values) if self.values else 0.0
+
+    def variance(self):
+        if not self.values:
+            return 0.0
+        mean = self.mean()
+        return max(0.0, self.sum_sq / len(self.values) - mean * mean)
+
+    def std(self):
+        return self.variance() ** 0.5
+
+    def cv(self):
+        # coefficient of variation, how noisy the signal is relative to its level
+        mean = self.mean()
+        return self.std() / abs(mean) if mean else 0.0
+
+    def min(self):
+        return self._min[0][1] if self._min else 0.0
+
+    def max(self):
+        return self._max[0][1] if self._max else 0.0
+
+    def smoothed(self):
+        if self.smoothing == "ewma" and self.ewma is not None:
+            return self.ewma
+        return self.mean()
+
+    def state(self):
+        return {"values": list(self.values), "ewma": self.ewma}
+
+    def restore(self, state):
+        # replay the saved window, then put back the EWMA that also remembers older samples
+        for value in state.get("values", [])[-self.window_size:]:
+            self.append(value)
+        if state.get("ewma") is not None:
+            self.ewma = state["ewma"]
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import threading
+
+class RolloutTracker:
+    # follows each adaptation until its new ReplicaSet is ready, then keeps the service warming up for a while
+    def __init__(self, actuator, warmup=120, timeout=600, poll_interval=5, log_file="datasets/rollouts.jsonl",
+                 instrumentation=None, clock=time.time, sleep=time.sleep):
+        self.actuator = actuator
+        self.warmup = warmup
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.log_file = log_file
+        self.instrumentation = instrumentation
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.rollouts = {}   # svc -> {"started", "ready", "warm_until"}
+
+    def _is_ready(self, status, generation):
+        # same conditions as `oc rollout status`: new spec observed, every replica updated and available, old pods gone
+        return (
+            status["observed_generation"] >= generation and
+            status["updated"] == status["replicas"] and
+            status["total"] == status["replicas"] and
+            status["available"] == status["replicas"]
+        )
+
+    def needs_warmup(self, current, adaptation):
+        # a scale-down that keeps the pod template creates no new ReplicaSet, the remaining pods are already warm
+        if not current:
+            return True
+        same_template = adaptation["requests"] == current["requests"] and adaptation["limits"] == current["limits"]
+        return not (same_template and adaptation["replica"] < current["replica"])
+
+    def track(self, svc):
+        started = self.clock()
+        with self.lock:
+            self.rollouts[svc] = {"started": started, "ready": None, "warm_until": None}
+        threading.Thread(target=self._wait, args=(svc, started), name=f"rollout-{svc}", daemon=True).start()
+
+    def _wait(self, svc, started):
+        generation = None
+        ready = None
+        while self.clock() - started < self.timeout:
+            try:
+                status = self.actuator.status(svc)
+                if generation is None:
+                    # the patch already bumped the generation, this is the spec to wait for
+                    generation = status["generation"]
+                if self._is_ready(status, generation):
+                    ready = self.clock()
+                    break
+            except Exception as e:
+                print(f"[ROLLOUT][WARNING] Failed to read status of {svc}: {e}")
+            self.sleep(self.poll_interval)
+
+        with self.lock:
+            rollout = self.rollouts.get(svc)
+            if rollout is None or rollout["started"] != started:
+                # superseded by a newer adaptation of the same service
+                return
+            rollout["ready"] = ready
+            # a rollout that never became ready still gets a warm-up, its pods are unreliable
+            rollout["warm_until"] = (ready or self.clock()) + self.warmup
+
+        if ready is None:
+            print(f"[ROLLOUT][WARNING] {svc} was not ready after {self.timeout}s")
+        else:
+            print(f"[ROLLOUT] {svc} ready after {ready - started:.1f}s, warming up for {self.warmup}s")
+            if self.instrumentation is not None:
+                self.instrumentation.observe("mapek_rollout_ready_seconds", ready - started, service=svc)
+        self._write_log({
+            "service": svc,
+            "started": started,
+            "ready": ready,
+            "time_to_ready": ready - started if ready is not None else None,
+            "timed_out": ready is None
+        })
+
+    def warming(self):
+        # services still rolling out or inside their warm-up window
+        now = self.clock()
+        with self.lock:
+            return {
+                svc for svc, rollout in self.rollouts.items()
+                if rollout["warm_until"] is None or now < rollout["warm_until"]
+            }
+
+    def _write_log(self, record):
+        try:
+            directory = os.path.dirname(self.log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.log_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            print(f"[ROLLOUT][ERROR] Failed to write {self.log_file}: {e}")
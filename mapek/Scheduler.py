@@ -0,0 +1,98 @@
+import math
+import time
+
+STAGES = ["monitor", "analyze", "plan", "execute"]
+
+class Cycle:
+    def __init__(self, number, start_ts, end_ts, tick, period, budgets, clock):
+        self.number = number
+        # monitoring window, consecutive cycles share their boundaries
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.tick = tick
+        self.clock = clock
+
+        # each stage may run until its cumulative share of the period is used up
+        self.deadlines = {}
+        elapsed = 0.0
+        for stage in STAGES:
+            elapsed += budgets.get(stage, 0.0)
+            self.deadlines[stage] = tick + elapsed * period
+        self.next_tick = tick + period
+
+    def remaining(self, stage):
+        return self.deadlines[stage] - self.clock()
+
+    def expired(self, stage):
+        return self.remaining(stage) <= 0
+
+    def overran(self):
+        return self.clock() >= self.next_tick
+
+
+class Scheduler:
+    def __init__(self, period, budgets=None, lag=0, clock=time.time, sleep=time.sleep):
+        self.period = period
+        self.budgets = budgets or {"monitor": 0.4, "analyze": 0.1, "plan": 0.1, "execute": 0.4}
+        # shift windows back so the monitoring backend has ingested the samples
+        self.lag = lag
+        self.clock = clock
+        self.sleep = sleep
+        self.skipped = 0
+
+    def set_period(self, period):
+        # takes effect from the tick after the cycle in progress
+        if period != self.period:
+            print(f"[SCHEDULER] Monitoring period {self.period}s -> {period}s")
+            self.period = period
+
+    def cycles(self):
+        # ticks are multiples of the period in wall-clock time, so the cadence never drifts
+        next_tick = math.ceil(self.clock() / self.period) * self.period
+        window_start = next_tick - self.period - self.lag
+        number = 0
+        while True:
+            wait = next_tick - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+
+            # ticks missed by an overrunning cycle are skipped, the next window covers them
+            missed = int((self.clock() - next_tick) // self.period)
+            if missed > 0:
+                self.skipped += missed
+                next_tick += missed * self.period
+                print(f"[SCHEDULER] Previous cycle overran, skipped {missed} tick(s)")
+
+            number += 1
+            window_end = next_tick - self.lag
+            yield Cycle(number, window_start, window_end, next_tick, self.period, self.budgets, self.clock)
+            window_start = window_end
+            next_tick += self.period
+
+
+class AdaptivePeriod:
+    # short cycles while a service needs attention or its load moves fast, backing off once everything is healthy
+    def __init__(self, min_period, max_period, backoff=2.0, rps_change=0.5):
+        self.min_period = min_period
+        self.max_period = max(max_period, min_period)
+        self.backoff = backoff
+        self.rps_change = rps_change
+        self.period = self.max_period
+        self.rps = {}
+
+    def _surging(self, observations):
+        rps = {svc: observation["request_per_second"] for svc, observation in observations.items()}
+        surging = [
+            svc for svc, previous in self.rps.items()
+            if svc in rps and previous and abs(rps[svc] - previous) / previous > self.rps_change
+        ]
+        self.rps = rps
+        return surging
+
+    def update(self, alerting, observations):
+        surging = self._surging(observations)
+        if alerting or surging:
+            self.period = self.min_period
+        else:
+            self.period = min(int(self.period * self.backoff), self.max_period)
+        return self.period
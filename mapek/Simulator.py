@@ -0,0 +1,176 @@
+import io
+import csv
+import copy
+import contextlib
+from datetime import datetime
+
+import numpy as np
+
+from mapek.Archive import RawArchive
+from mapek.Aggregator import Aggregator
+
+# dataset column -> (metric, aggregation) the Analyzer expects
+CSV_METRICS = {
+    "cpu.quota.used.percent": [("cpu.quota.used.percent", "avg")],
+    "memory.limit.used.percent": [("memory.limit.used.percent", "avg")],
+    "jvm.heap.used.percent": [("jvm.heap.used.percent", "avg")],
+    "jvm.gc.global.time": [("jvm.gc.global.time", "avg")],
+    "kubernetes.deployment.replicas.available": [("kubernetes.deployment.replicas.available", "max")],
+    "net.http.request.time": [("net.http.request.time", "max")],
+    "net.request.count.in": [("net.request.count.in", "sum")],
+    "net.http.error.count": [("net.http.error.count", "sum")],
+    # the dataset only keeps the max latency, it stands in for the average as well
+    "net.request.time.in": [("net.request.time.in", "max"), ("net.request.time.in", "avg")],
+    "net.bytes.in": [("net.bytes.in", "max")],
+    "net.bytes.out": [("net.bytes.out", "max")],
+    "net.bytes.total": [("net.bytes.total", "max"), ("net.bytes.total", "sum")],
+    "jvm.nonHeap.used.percent": [("jvm.nonHeap.used.percent", "avg")],
+    "jvm.thread.count": [("jvm.thread.count", "max")],
+    "jvm.gc.global.count": [("jvm.gc.global.count", "sum")],
+}
+
+def load_csv_trace(csv_file, service_to_use):
+    # one cycle per timestamp, every value becomes a single sample of its service
+    cycles = {}
+    with open(csv_file, "r", newline='') as f:
+        for row in csv.DictReader(f):
+            if row["service"] not in service_to_use:
+                continue
+            ts = datetime.fromisoformat(row["timestamp"]).timestamp()
+            data_dict = cycles.setdefault(ts, {})
+            for column, keys in CSV_METRICS.items():
+                if not row.get(column):
+                    continue
+                for key in keys:
+                    data_dict.setdefault(key, {"data": []})["data"].append(
+                        {"t": int(ts), "d": [row["service"], float(row[column])]}
+                    )
+    return sorted(cycles.items())
+
+def load_archive_trace(root, period, start=0, end=float("inf")):
+    # responses collected in the same period form one cycle
+    columns = RawArchive(root).read(start, end)
+    cycles = {}
+    for fetched, t, metric, service, value in zip(
+        columns["fetched"], columns["t"], columns["metric"], columns["service"], columns["value"]
+    ):
+        bucket = int(fetched // period) * period
+        metric_id, aggregation = columns["metrics"][metric].split("|")
+        data_dict = cycles.setdefault(bucket, {})
+        data_dict.setdefault((metric_id, aggregation), {"data": []})["data"].append(
+            {"t": int(t), "d": [columns["services"][service], None if np.isnan(value) else float(value)]}
+        )
+    return sorted(cycles.items())
+
+
+class ClusterModel:
+    # rescales recorded metrics to the simulated allocation of each service
+    def __init__(self, recorded_configs, max_utilization=0.95):
+        self.recorded_configs = recorded_configs
+        self.max_utilization = max_utilization
+
+    def _capacity(self, config, key):
+        return config["limits"][key] * config["replica"]
+
+    def apply(self, data_dict, configs, recorded_cpu):
+        factors = {}
+        for svc, config in configs.items():
+            recorded = self.recorded_configs[svc]
+            cpu_factor = self._capacity(recorded, "cpu") / self._capacity(config, "cpu")
+            memory_factor = recorded["limits"]["memory"] / config["limits"]["memory"]
+            # M/M/1 style response time, latency grows as 1 / (1 - utilization)
+            rho_recorded = min(recorded_cpu.get(svc, 0.0) / 100, self.max_utilization)
+            rho_simulated = min(rho_recorded * cpu_factor, self.max_utilization)
+            latency_factor = (1 - rho_recorded) / (1 - rho_simulated)
+            factors[svc] = {
+                ("cpu.quota.used.percent", "avg"): lambda v, f=cpu_factor: min(v * f, 100.0),
+                ("memory.limit.used.percent", "avg"): lambda v, f=memory_factor: min(v * f, 100.0),
+                ("net.request.time.in", "avg"): lambda v, f=latency_factor: v * f,
+                ("net.request.time.in", "max"): lambda v, f=latency_factor: v * f,
+                ("kubernetes.deployment.replicas.available", "max"): lambda v, r=config["replica"]: r,
+            }
+
+        simulated = {}
+        for key, res in data_dict.items():
+            data = []
+            for e in res["data"]:
+                svc, value = e["d"][0], e["d"][1]
+                transform = factors.get(svc, {}).get(key)
+                if transform is not None and value is not None:
+                    value = transform(value)
+                data.append({"t": e["t"], "d": [svc, value]})
+            simulated[key] = {"data": data}
+        return simulated
+
+
+class Simulator:
+    def __init__(self, analyzer, planner, service_to_use, initial_configs, period, verbose=False, stabilizer=None):
+        self.analyzer = analyzer
+        self.planner = planner
+        self.stabilizer = stabilizer
+        self.services = service_to_use
+        self.aggregator = Aggregator(service_to_use)
+        self.initial_configs = initial_configs
+        self.period = period
+        self.verbose = verbose
+
+    def run(self, trace, recorded_configs=None):
+        model = ClusterModel(recorded_configs or self.initial_configs)
+        configs = copy.deepcopy(self.initial_configs)
+        report = {
+            "cycles": 0,
+            "analyzed_cycles": 0,
+            "total_utility": 0.0,
+            "slo_violations": 0,
+            "adaptations": 0,
+            "cpu_core_seconds": 0.0,
+            "memory_gib_seconds": 0.0,
+            "replica_seconds": 0.0,
+            "suppressed": 0,
+        }
+
+        for timestamp, data_dict in trace:
+            recorded = self.aggregator.aggregate(data_dict)
+            recorded_cpu = {
+                svc: values.get(("cpu.quota.used.percent", "avg"), 0.0) for svc, values in recorded.items()
+            }
+            simulated = model.apply(data_dict, configs, recorded_cpu)
+
+            # the components print a lot, keep the replay quiet unless asked
+            output = None if self.verbose else io.StringIO()
+            with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+                analysis_results = self.analyzer.process_data(simulated)
+                decisions, new_configs = {}, configs
+                if analysis_results or self.planner.mode == "predictive":
+                    decisions, new_configs, situations = self.planner.evaluate_services(
+                        analysis_results, configs, self.analyzer.observations
+                    )
+                    if self.stabilizer:
+                        # trace time drives the cooldowns, the replay runs much faster than real time
+                        decisions, new_configs, _ = self.stabilizer.filter(decisions, new_configs, situations, configs, timestamp)
+                        self.stabilizer.commit(decisions, configs, timestamp)
+                    # every decision takes effect in the replay
+                    self.planner.commit(decisions, configs)
+
+            report["cycles"] += 1
+            if analysis_results:
+                report["analyzed_cycles"] += 1
+                report["total_utility"] += sum(r["overall_utility"] for r in analysis_results.values())
+                # service-cycles breaching a latency or error-rate threshold, resource bands aside
+                report["slo_violations"] += sum(
+                    1 for r in analysis_results.values()
+                    if any(metric.startswith("latency_") or metric == "error_rate_high" for metric in r["unhealthy_metrics"])
+                )
+            report["adaptations"] += sum(1 for decision in decisions.values() if decision)
+
+            # resources held during this cycle, changes take effect from the next one
+            for config in configs.values():
+                report["cpu_core_seconds"] += config["limits"]["cpu"] / 1000 * config["replica"] * self.period
+                report["memory_gib_seconds"] += config["limits"]["memory"] / 1024 * config["replica"] * self.period
+                report["replica_seconds"] += config["replica"] * self.period
+            configs = new_configs
+
+        if self.stabilizer:
+            report["suppressed"] = self.stabilizer.suppressed
+        report["final_configs"] = configs
+        return report
@@ -0,0 +1,39 @@
+import math
+
+class DDSketch:
+    # quantiles with a bounded relative error from logarithmic buckets, two sketches merge by adding their counts
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value, count=1):
+        if value <= 0:
+            self.zeros += count
+        else:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
@@ -0,0 +1,158 @@
+import os
+import copy
+import json
+import time
+
+# every value of a configuration the Executor can change
+DIMENSIONS = [("requests", "cpu"), ("limits", "cpu"), ("requests", "memory"), ("limits", "memory"), ("replica", None)]
+
+def _get(config, dimension):
+    section, key = dimension
+    return config[section] if key is None else config[section][key]
+
+def _set(config, dimension, value):
+    section, key = dimension
+    if key is None:
+        config[section] = value
+    else:
+        config[section][key] = value
+
+
+class Stabilizer:
+    # sits between the Planner and the Executor and holds back changes that would flap
+    def __init__(self, state_file="datasets/stabilizer_state.json", up_cooldown=120, down_cooldown=300,
+                 down_window=300, history=6, max_reversals=2, hold=600, clock=time.time):
+        self.state_file = state_file
+        self.up_cooldown = up_cooldown
+        self.down_cooldown = down_cooldown
+        self.down_window = down_window
+        self.history = history
+        self.max_reversals = max_reversals
+        self.hold = hold
+        self.clock = clock
+
+        self.last_change = {}       # svc -> {"up": ts, "down": ts}
+        self.recommendations = {}   # svc -> [[ts, config], ...] within the scale-down window
+        self.directions = {}        # svc -> last applied directions
+        self.held_until = {}        # svc -> ts until which scale-downs are blocked
+        self.suppressed = 0
+        self._load()
+
+    # ---------- state ----------
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[STABILIZER][ERROR] Ignoring unreadable state {self.state_file}: {e}")
+            return
+        self.last_change = state.get("last_change", {})
+        self.recommendations = state.get("recommendations", {})
+        self.directions = state.get("directions", {})
+        self.held_until = state.get("held_until", {})
+        self.suppressed = state.get("suppressed", 0)
+
+    def _save(self):
+        if not self.state_file:
+            return
+        state = {
+            "last_change": self.last_change,
+            "recommendations": self.recommendations,
+            "directions": self.directions,
+            "held_until": self.held_until,
+            "suppressed": self.suppressed
+        }
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # write a sibling file and rename it, a crash never leaves half a state behind
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            print(f"[STABILIZER][ERROR] Failed to write {self.state_file}: {e}")
+
+    # ---------- checks ----------
+    def _cooling_down(self, svc, direction, now):
+        # a change in either direction restarts both cooldowns, so up-down-up is slowed too
+        cooldown = self.up_cooldown if direction == "up" else self.down_cooldown
+        last = max(self.last_change.get(svc, {}).values(), default=None)
+        return last is not None and now - last < cooldown
+
+    def _reversals(self, svc):
+        directions = self.directions.get(svc, [])[-self.history:]
+        return sum(1 for a, b in zip(directions, directions[1:]) if a != b)
+
+    def _stabilized_down(self, svc, dimension, current):
+        # the highest value recommended within the window, a scale-down only follows a sustained need
+        values = [_get(config, dimension) for _, config in self.recommendations.get(svc, [])]
+        return min(current, max(values, default=current))
+
+    # ---------- filtering ----------
+    def filter(self, decisions, new_configs, system_situations, current_configs, now=None):
+        now = self.clock() if now is None else now
+        decisions = dict(decisions)
+        new_configs = dict(new_configs)
+        system_situations = dict(system_situations)
+
+        for svc, config in current_configs.items():
+            # no decision means the Planner recommends the current size
+            recommended = decisions.get(svc) or config
+            recent = [entry for entry in self.recommendations.get(svc, []) if now - entry[0] < self.down_window]
+            self.recommendations[svc] = recent + [[now, copy.deepcopy(recommended)]]
+
+        for svc, decision in decisions.items():
+            if not decision or decision == current_configs[svc]:
+                continue
+            config = current_configs[svc]
+            stabilized = copy.deepcopy(decision)
+            held = now < self.held_until.get(svc, 0)
+            for dimension in DIMENSIONS:
+                current, value = _get(config, dimension), _get(decision, dimension)
+                if value > current and self._cooling_down(svc, "up", now):
+                    _set(stabilized, dimension, current)
+                elif value < current:
+                    if held or self._cooling_down(svc, "down", now):
+                        _set(stabilized, dimension, current)
+                    else:
+                        _set(stabilized, dimension, max(value, self._stabilized_down(svc, dimension, current)))
+
+            if stabilized == config:
+                reason = "oscillating, scale-downs on hold" if held else "cooldown or scale-down window"
+                print(f"[STABILIZER] Suppressed rollout for {svc} ({reason})")
+                self.suppressed += 1
+                decisions[svc] = None
+                new_configs[svc] = config
+                system_situations.pop(svc, None)
+            else:
+                if stabilized != decision:
+                    print(f"[STABILIZER] Damped change for {svc}: {stabilized}")
+                decisions[svc] = stabilized
+                new_configs[svc] = stabilized
+
+        self._save()
+        return decisions, new_configs, system_situations
+
+    def commit(self, decisions, current_configs, now=None):
+        # record the changes that were applied
+        now = self.clock() if now is None else now
+        for svc, decision in decisions.items():
+            if not decision:
+                continue
+            config = current_configs[svc]
+            changes = [_get(decision, dimension) - _get(config, dimension) for dimension in DIMENSIONS]
+            moved = [direction for direction, changed in
+                     [("up", any(c > 0 for c in changes)), ("down", any(c < 0 for c in changes))] if changed]
+            for direction in moved:
+                self.last_change.setdefault(svc, {})[direction] = now
+            self.directions[svc] = (self.directions.get(svc, []) + moved)[-self.history:]
+
+            if self._reversals(svc) >= self.max_reversals:
+                print(f"[STABILIZER] {svc} is oscillating, holding scale-downs for {self.hold}s")
+                self.held_until[svc] = now + self.hold
+                self.directions[svc] = []
+        self._save()
@@ -0,0 +1,170 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mapek.Aggregator import Aggregator
+
+THRESHOLD_KEYS = ["cpu_low", "cpu_high", "memory_low", "memory_high", "latency_avg", "error_rate"]
+WEIGHT_KEYS = ["cpu", "memory", "latency", "error_rate"]
+
+def trace_to_signals(trace, service_to_use, window_size=5, confidence=0.8, latency_max_threshold=None):
+    # per cycle and service: the same windowed means the Analyzer evaluates, flattened to 1-D
+    # models the "avg" latency target without change-point detection, percentile targets and outlier
+    # replacement in the Analyzer are not reproduced here
+    aggregator = Aggregator(service_to_use)
+    n_cycles, n_services = len(trace), len(service_to_use)
+    raw = {key: np.zeros((n_cycles, n_services)) for key in ["cpu", "memory", "latency", "error_rate"]}
+    latency_max = np.zeros((n_cycles, n_services))
+    for t, (_, data_dict) in enumerate(trace):
+        aggregated = aggregator.aggregate(data_dict)
+        for s, svc in enumerate(service_to_use):
+            values = aggregated.get(svc, {})
+            requests = values.get(("net.request.count.in", "sum"), 0)
+            errors = values.get(("net.http.error.count", "sum"), 0)
+            raw["cpu"][t, s] = values.get(("cpu.quota.used.percent", "avg"), 0)
+            raw["memory"][t, s] = values.get(("memory.limit.used.percent", "avg"), 0)
+            raw["latency"][t, s] = values.get(("net.request.time.in", "avg"), 0) / 1000000
+            raw["error_rate"][t, s] = errors / requests if requests else 0
+            latency_max[t, s] = values.get(("net.request.time.in", "max"), 0) / 1000000
+
+    # rolling mean over the last window_size cycles, computed with a cumulative sum
+    windowed = {}
+    counts = np.minimum(np.arange(1, n_cycles + 1), window_size)[:, None]
+    for key, values in raw.items():
+        cumsum = np.cumsum(np.vstack([np.zeros((1, n_services)), values]), axis=0)
+        starts = np.maximum(np.arange(1, n_cycles + 1) - window_size, 0)
+        windowed[key] = (cumsum[1:] - cumsum[starts]) / counts
+
+    # cycles the Analyzer would skip while its window fills up
+    valid = (counts[:, 0] / window_size) >= confidence
+    return {
+        "windowed": {key: values[valid] for key, values in windowed.items()},
+        "raw": {key: values[valid] for key, values in raw.items()},
+        "raw_next": {key: np.vstack([values[1:], values[-1:]])[valid] for key, values in raw.items()},
+        # the max latency threshold is not swept, the Analyzer checks it against each cycle's value
+        "latency_max_high": (latency_max > latency_max_threshold)[valid] if latency_max_threshold is not None
+                            else np.zeros((n_cycles, n_services), dtype=bool)[valid],
+    }
+
+def build_grid(threshold_values, weight_step=0.1):
+    # cartesian product of the threshold candidates and every weight vector on the simplex
+    steps = int(round(1 / weight_step))
+    weights = [
+        np.array(combo) * weight_step
+        for combo in itertools.product(range(steps + 1), repeat=len(WEIGHT_KEYS))
+        if sum(combo) == steps
+    ]
+    threshold_grid = np.array(list(itertools.product(*(threshold_values[key] for key in THRESHOLD_KEYS))), dtype=float)
+    # a low bound must stay below its high bound
+    threshold_grid = threshold_grid[
+        (threshold_grid[:, 0] < threshold_grid[:, 1]) & (threshold_grid[:, 2] < threshold_grid[:, 3])
+    ]
+    weight_grid = np.array(weights)
+    thresholds = np.repeat(threshold_grid, len(weight_grid), axis=0)
+    weights = np.tile(weight_grid, (len(threshold_grid), 1))
+    grid = {key: thresholds[:, idx] for idx, key in enumerate(THRESHOLD_KEYS)}
+    grid.update({f"w_{key}": weights[:, idx] for idx, key in enumerate(WEIGHT_KEYS)})
+    return grid
+
+def evaluate_grid(grid, signals, slo_latency, slo_error_rate):
+    # every configuration against every sample at once, shapes are (configurations, samples)
+    def column(key):
+        return grid[key][:, None]
+
+    def row(values):
+        return values.reshape(1, -1)
+
+    cpu = row(signals["windowed"]["cpu"])
+    memory = row(signals["windowed"]["memory"])
+    latency = row(signals["windowed"]["latency"])
+    error_rate = row(signals["windowed"]["error_rate"])
+
+    # same formulas as Analyzer._normalize_high_is_good / _normalize_low_is_good
+    cpu_utility = (cpu - column("cpu_low")) / (column("cpu_high") - column("cpu_low"))
+    memory_utility = (memory - column("memory_low")) / (column("memory_high") - column("memory_low"))
+    latency_utility = np.maximum(0.0, 1.0 - np.minimum(latency / column("latency_avg"), 1.0))
+    error_rate_utility = np.maximum(0.0, 1.0 - np.minimum(error_rate / column("error_rate"), 1.0))
+    utility = (cpu_utility * column("w_cpu") + memory_utility * column("w_memory") +
+               latency_utility * column("w_latency") + error_rate_utility * column("w_error_rate"))
+
+    unhealthy_count = (
+        (cpu > column("cpu_high")).astype(np.int8) + (cpu < column("cpu_low")) +
+        (memory > column("memory_high")) + (memory < column("memory_low")) +
+        (latency > column("latency_avg")) + (error_rate > column("error_rate")) +
+        row(signals["latency_max_high"])
+    )
+    healthy = (utility >= 0.8) & (unhealthy_count == 0)
+    unhealthy = ~healthy & ((utility < 0.5) | (unhealthy_count >= 2))
+    alert = ~healthy
+
+    # a configuration is good when it flags the cycles that precede an SLO breach, and only those
+    breach = row((signals["raw_next"]["latency"] > slo_latency) | (signals["raw_next"]["error_rate"] > slo_error_rate))
+    true_positive = (alert & breach).sum(axis=1)
+    false_positive = (alert & ~breach).sum(axis=1)
+    false_negative = (~alert & breach).sum(axis=1)
+    precision = true_positive / np.maximum(true_positive + false_positive, 1)
+    recall = true_positive / np.maximum(true_positive + false_negative, 1)
+    f1 = 2 * precision * recall / np.maximum(precision + recall, 1e-12)
+
+    return {
+        "score": f1,
+        "precision": precision,
+        "recall": recall,
+        "alert_rate": alert.mean(axis=1),
+        "unhealthy_rate": unhealthy.mean(axis=1),
+        "mean_utility": utility.mean(axis=1),
+    }
+
+def _evaluate_chunk(args):
+    grid, signals, slo_latency, slo_error_rate, chunk_size = args
+    n = len(next(iter(grid.values())))
+    parts = []
+    for start in range(0, n, chunk_size):
+        chunk = {key: values[start:start + chunk_size] for key, values in grid.items()}
+        parts.append(evaluate_grid(chunk, signals, slo_latency, slo_error_rate))
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+def sweep(grid, signals, slo_latency, slo_error_rate, workers=1, chunk_size=2000, top=20):
+    n = len(next(iter(grid.values())))
+    if workers > 1 and n > chunk_size:
+        # contiguous slices of the grid, one per task, evaluated in separate processes
+        bounds = np.linspace(0, n, workers * 4 + 1, dtype=int)
+        tasks = [
+            ({key: values[a:b] for key, values in grid.items()}, signals, slo_latency, slo_error_rate, chunk_size)
+            for a, b in zip(bounds[:-1], bounds[1:]) if b > a
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_evaluate_chunk, tasks))
+        results = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    else:
+        results = _evaluate_chunk((grid, signals, slo_latency, slo_error_rate, chunk_size))
+
+    # best score first, fewer alerts (fewer rollouts) breaks ties
+    order = np.lexsort((results["alert_rate"], -results["score"]))[:top]
+    ranked = []
+    for idx in order:
+        ranked.append({
+            "thresholds": {
+                "cpu": {"low": float(grid["cpu_low"][idx]), "high": float(grid["cpu_high"][idx])},
+                "memory": {"low": float(grid["memory_low"][idx]), "high": float(grid["memory_high"][idx])},
+                "latency": {"avg": float(grid["latency_avg"][idx])},
+                "error_rate": float(grid["error_rate"][idx]),
+            },
+            "weights": {key: round(float(grid[f"w_{key}"][idx]), 4) for key in WEIGHT_KEYS},
+            **{key: float(values[idx]) for key, values in results.items()},
+        })
+    return ranked
+
+def apply_configuration(knowledge, configuration):
+    thresholds = configuration["thresholds"]
+    knowledge.set_threshold("cpu", "low", thresholds["cpu"]["low"])
+    knowledge.set_threshold("cpu", "high", thresholds["cpu"]["high"])
+    knowledge.set_threshold("memory", "low", thresholds["memory"]["low"])
+    knowledge.set_threshold("memory", "high", thresholds["memory"]["high"])
+    knowledge.set_threshold("latency", "avg", thresholds["latency"]["avg"])
+    knowledge.set_threshold("error_rate", "error_rate", thresholds["error_rate"])
+    for key, value in configuration["weights"].items():
+        knowledge.set_weight(key, value)
+    # the set_* calls above are coalesced, write them out now
+    knowledge.flush()
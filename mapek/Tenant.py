@@ -0,0 +1,196 @@
+import os
+import time
+from collections import deque
+
+from mapek.Analyzer import Analyzer
+from mapek.Planner import Planner
+from mapek.Stabilizer import Stabilizer
+from mapek.Rollout import RolloutTracker
+from mapek.Executor import Executor
+from mapek.Actuator import KubernetesActuator
+from mapek.Aggregator import Aggregator
+from mapek.Checkpoint import Checkpoint
+
+def build_configs(resources, service_to_use):
+    return {
+            svc: {
+                "requests": {
+                    "cpu": resources[svc]["requests"]["cpu"],
+                    "memory": resources[svc]["requests"]["memory"]
+                },
+                "limits": {
+                    "cpu": resources[svc]["limits"]["cpu"],
+                    "memory": resources[svc]["limits"]["memory"]
+                },
+                "replica": resources[svc]["replica"]
+            }
+            for svc in service_to_use
+    }
+
+
+class Tenant:
+    # Analyzer, Planner and Executor state of one namespace, fed from the shared Monitor
+    def __init__(self, namespace, knowledge, service_to_use, analyze_metrics, dataset, executor_parallel=False,
+                 executor_backend="shell", data_dir="datasets", instrumentation=None):
+        self.namespace = namespace
+        self.knowledge = knowledge
+        self.services = service_to_use
+        self.dataset = dataset
+        self.instrumentation = instrumentation
+        self.current_configs = build_configs(knowledge.get_resources(), service_to_use)
+        self.knowledge_version = knowledge.version
+        self.recent_decisions = deque(maxlen=10)
+        # whether the last analysis found a service in warning or unhealthy state
+        self.alerting = False
+
+        self.aggregator = Aggregator(service_to_use)
+        self.analyzer = Analyzer(analyze_metrics, service_to_use, knowledge.get_threshold(), knowledge.get_weight(), knowledge.get_analysis())
+        # files written by the components live in the tenant's own directory
+        planning = dict(knowledge.get_planning())
+        if planning.get("roi_model", {}).get("history_file"):
+            history_file = os.path.join(data_dir, os.path.basename(planning["roi_model"]["history_file"]))
+            planning["roi_model"] = {**planning["roi_model"], "history_file": history_file}
+        self.planner = Planner(service_to_use, knowledge.get_resource_limitations(), knowledge.get_threshold()["roi"], planning, knowledge.get_threshold(), knowledge.get_dependencies(), knowledge.get_weight())
+
+        stabilization = knowledge.get_stabilization()
+        self.stabilizer = None
+        if stabilization.get("enabled", False):
+            self.stabilizer = Stabilizer(
+                os.path.join(data_dir, os.path.basename(stabilization.get("state_file", "stabilizer_state.json"))),
+                stabilization.get("cooldown", {}).get("up", 120),
+                stabilization.get("cooldown", {}).get("down", 300),
+                stabilization.get("down_window", 300),
+                stabilization.get("history", 6),
+                stabilization.get("max_reversals", 2),
+                stabilization.get("hold", 600)
+            )
+
+        actuator = KubernetesActuator(namespace) if executor_backend == "kubernetes" else None
+        self.executor = Executor(executor_parallel, actuator=actuator)
+
+        # rollouts are followed through the Kubernetes API whichever backend applies them
+        self.rollout = knowledge.get_rollout()
+        self.tracker = None
+        status_actuator = None
+        if self.rollout.get("enabled", False):
+            try:
+                status_actuator = actuator or KubernetesActuator(namespace)
+            except Exception as e:
+                # the shell backend works without API access, only the rollout tracking is lost
+                print(f"[{namespace}][WARNING] No Kubernetes API access, rollout tracking disabled: {e}")
+        if status_actuator is not None:
+            self.tracker = RolloutTracker(
+                status_actuator,
+                self.rollout.get("warmup", 120),
+                self.rollout.get("timeout", 600),
+                self.rollout.get("poll_interval", 5),
+                f"{data_dir}/rollouts.jsonl",
+                instrumentation
+            )
+
+        # warm-start snapshot of windows, configurations and recent decisions
+        self.checkpoint = Checkpoint(f"{data_dir}/checkpoint.json.gz") if knowledge.get_checkpoint().get("enabled", False) else None
+
+    def close(self):
+        # flush the buffered dataset rows and adaptation history
+        self.dataset.close()
+        if self.planner.utility_model:
+            self.planner.utility_model.close()
+
+    def save_checkpoint(self):
+        if self.checkpoint is None:
+            return
+        self.checkpoint.save({
+            "current_configs": self.current_configs,
+            "analyzer": self.analyzer.checkpoint(),
+            "planner": self.planner.checkpoint(),
+            "decisions": list(self.recent_decisions)
+        })
+
+    def restore_checkpoint(self, max_age):
+        # returns whether the analysis windows are warm, a stale snapshot only restores the rest
+        if self.checkpoint is None:
+            return True
+        state, age = self.checkpoint.load()
+        if state is None:
+            return False
+        self.current_configs = {svc: state["current_configs"].get(svc, config) for svc, config in self.current_configs.items()}
+        self.planner.restore(state.get("planner", {}))
+        self.recent_decisions.extend(state.get("decisions", []))
+        if age > max_age:
+            print(f"[{self.namespace}] Checkpoint is {age:.0f}s old, analysis windows need a backfill")
+            return False
+        self.analyzer.restore(state.get("analyzer", {}))
+        print(f"[{self.namespace}] Restored checkpoint from {age:.0f}s ago")
+        return True
+
+    def reload_policy(self):
+        # swap in thresholds, weights and limits of a reloaded knowledge file, windows stay warm
+        version, data = self.knowledge.snapshot()
+        if version == self.knowledge_version:
+            return
+        thresholds = data["thresholds"]
+        self.analyzer.set_policy(thresholds, data["weights"])
+        self.planner.set_policy(data["resources_limitations"], thresholds["roi"], thresholds)
+        self.knowledge_version = version
+        print(f"[{self.namespace}] Applied knowledge version {version}")
+
+    def step(self, cycle, data_dict, timestamp):
+        # analyze, plan and execute one cycle, returns whether the Executor ran
+        self.reload_policy()
+        # per-service means shared by the Analyzer and the CSV writer
+        aggregated = self.aggregator.aggregate(data_dict)
+
+        # ANALYZE: Process metrics
+        print(f"[Analyzing Stage] {self.namespace}")
+        if self.tracker:
+            self.analyzer.set_warming(self.tracker.warming(), self.rollout.get("mask", True))
+        analysis_results = self.analyzer.process_data(data_dict, aggregated)
+        self.alerting = any(result["adaptation"] != "healthy" for result in analysis_results.values())
+        if len(analysis_results) == 0 and self.planner.mode != "predictive":
+            print("Need to gather more data to continue, preventing from scaling flapping")
+            return False
+
+        # PLAN: Generate adaptation decisions
+        if cycle.expired("analyze"):
+            print("[SCHEDULER] Out of time budget, skipping planning and execution in this cycle")
+            self.dataset.append(timestamp, data_dict, aggregated)
+            return False
+        print(f"[Planning Stage] {self.namespace}")
+        decisions, new_configs, system_situations = self.planner.evaluate_services(analysis_results, self.current_configs, self.analyzer.observations)
+        if self.stabilizer:
+            suppressed = self.stabilizer.suppressed
+            decisions, new_configs, system_situations = self.stabilizer.filter(decisions, new_configs, system_situations, self.current_configs)
+            if self.instrumentation is not None:
+                self.instrumentation.inc("mapek_rollouts_suppressed_total", self.stabilizer.suppressed - suppressed)
+        print("")
+
+        # EXECUTE: Apply adaptations
+        if cycle.expired("plan"):
+            print("[SCHEDULER] Out of time budget, skipping execution in this cycle")
+            self.dataset.append(timestamp, data_dict, aggregated)
+            return False
+        print(f"[Executing Stage] {self.namespace}")
+        success = self.executor.execute_plan(
+            decisions, self.current_configs, system_situations, lambda: cycle.expired("execute")
+        )
+        if success:
+            print("Successfully executed adaptation")
+            self.planner.commit(decisions, self.current_configs)
+            if self.stabilizer:
+                self.stabilizer.commit(decisions, self.current_configs)
+            if self.tracker:
+                for svc, decision in decisions.items():
+                    if decision and self.tracker.needs_warmup(self.current_configs.get(svc), decision):
+                        self.tracker.track(svc)
+            self.recent_decisions.append({
+                "timestamp": time.time(),
+                "decisions": {svc: decision for svc, decision in decisions.items() if decision}
+            })
+            self.current_configs = new_configs
+        else:
+            print("Failed to execute adaptation")
+
+        # KNOWLEDGE: Store data with adaptation information
+        self.dataset.append(timestamp, data_dict, aggregated)
+        return True
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+
+import numpy as np
+
+def _ratio(value, base):
+    return value / base if base else 1.0
+
+def _capacity(config, key):
+    return config["limits"][key] * config["replica"]
+
+class UtilityModel:
+    # predicts the utility an action leads to: the utilization it leaves follows from the new capacity,
+    # the latency and error rate at that utilization are learned online by recursive least squares
+    def __init__(self, thresholds, weights, forgetting=0.995, min_samples=60, history_file=None, flush_interval=300):
+        self.thresholds = thresholds
+        self.utility_weights = weights
+        self.forgetting = forgetting
+        self.min_samples = min_samples
+        self.history_file = history_file
+        self.flush_interval = flush_interval
+        self.records = []
+        self.last_flush = time.time()
+        self.file = None
+
+        size = len(self.features(0))
+        # one column per learned target, latency and error rate relative to their thresholds
+        self.weights = np.zeros((size, 2))
+        self.covariance = np.eye(size) * 1000.0
+        self.samples = 0
+        self._replay()
+
+    def project(self, result, config, new_config, load_change=1.0):
+        # CPU is shared by all replicas, memory is used per pod
+        cpu = result["cpu"] * _ratio(_capacity(config, "cpu"), _capacity(new_config, "cpu")) * load_change
+        memory = result["memory"] * _ratio(config["limits"]["memory"], new_config["limits"]["memory"])
+        return min(cpu, 100.0), min(memory, 100.0)
+
+    def features(self, cpu):
+        # queueing delay grows as u / (1 - u)
+        u = min(cpu / 100, 0.95)
+        return np.array([1.0, u, u / (1 - u)])
+
+    def _latency(self, result):
+        return min(result["latency_avg"] / self.thresholds["latency"]["avg"], 5.0)
+
+    def _error_rate(self, result):
+        return min(result["error_rate"] / self.thresholds["error_rate"], 5.0)
+
+    def _saturation(self, value, key):
+        # rises through the band like the Analyzer's utility, but falls again past the high threshold
+        low, high = self.thresholds[key]["low"], self.thresholds[key]["high"]
+        if value > high:
+            return 1.0 - (value - high) / (100 - high)
+        return (value - low) / (high - low)
+
+    def utility(self, cpu, memory, latency, error_rate):
+        # the Analyzer's utility keeps rewarding usage past the high threshold and stops at a breached SLO,
+        # which made relieving a saturated service look like a loss
+        return (
+            self.utility_weights["cpu"] * self._saturation(cpu, "cpu") +
+            self.utility_weights["memory"] * self._saturation(memory, "memory") +
+            self.utility_weights["latency"] * max(-1.0, 1.0 - latency) +
+            self.utility_weights["error_rate"] * max(-1.0, 1.0 - error_rate)
+        )
+
+    @property
+    def ready(self):
+        return self.samples >= self.min_samples
+
+    def predict(self, result, config, new_config):
+        # utility at the next cycle if the load stays where it is
+        cpu, memory = self.project(result, config, new_config)
+        latency, error_rate = self.features(cpu) @ self.weights
+        return self.utility(cpu, memory, max(latency, 0.0), max(error_rate, 0.0))
+
+    def benefit(self, result, config, new_config):
+        # expected utility change of acting compared with leaving the service as it is
+        return self.predict(result, config, new_config) - self.predict(result, config, config)
+
+    def update(self, result, config, new_config, post_result, record=True):
+        # every analyzed cycle is a sample, the applied config may be unchanged
+        load_change = _ratio(post_result["request_per_second"], result["request_per_second"])
+        cpu, _ = self.project(result, config, new_config, load_change)
+        x = self.features(cpu)
+        target = np.array([self._latency(post_result), self._error_rate(post_result)])
+        px = self.covariance @ x
+        gain = px / (self.forgetting + x @ px)
+        self.weights += np.outer(gain, target - x @ self.weights)
+        self.covariance = (self.covariance - np.outer(gain, px)) / self.forgetting
+        self.samples += 1
+        if record:
+            self._write_history(result, config, new_config, post_result)
+
+    # ---------- adaptation history ----------
+    def _state(self, result):
+        return {key: result[key] for key in ["cpu", "memory", "latency_avg", "error_rate", "request_per_second"]}
+
+    def _write_history(self, result, config, new_config, post_result):
+        if not self.history_file:
+            return
+        self.records.append({
+            "timestamp": time.time(),
+            "service": result.get("service"),
+            "result": self._state(result),
+            "config": config,
+            "new_config": new_config,
+            "post_result": self._state(post_result)
+        })
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        # buffered like the metrics dataset, one append per flush interval on a file kept open
+        if not self.records:
+            return
+        try:
+            if self.file is None:
+                directory = os.path.dirname(self.history_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self.file = open(self.history_file, "a")
+            self.file.write("".join(json.dumps(record) + "\n" for record in self.records))
+            self.file.flush()
+        except Exception as e:
+            print(f"[ROI][ERROR] Failed to write {self.history_file}: {e}")
+        self.records = []
+        self.last_flush = time.time()
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _replay(self):
+        # train on the history of previous runs so the model is usable right after a restart
+        if not self.history_file or not os.path.exists(self.history_file):
+            return
+        with open(self.history_file, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self.update(record["result"], record["config"], record["new_config"], record["post_result"], record=False)
+                except (ValueError, KeyError) as e:
+                    print(f"[ROI][WARNING] Skipping history record: {e}")
+        print(f"[ROI] Trained on {self.samples} recorded cycles")
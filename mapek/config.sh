@@ -85,16 +85,18 @@ files=("$MICRO_DIR/deploy-acmeair-mainservice-java.yaml"
 mkdir -p "$BACKUP_DIR"
 timestamp=$(date +%Y%m%d_%H%M%S)
 
-for file in "${files[@]}"; do
-  svc=$(echo "$file" | grep -oE "acmeair-[a-z]+service" | head -1)
-  if [ -z "$service" ] || [ "$service" == "$svc" ]; then
-    if [ -f "$file" ]; then
-      backup_path="$BACKUP_DIR/${svc}_${timestamp}.yaml"
-      cp "$file" "$backup_path"
-      echo "[BACKUP] Saved $svc → $backup_path"
+if [ "$DRY_RUN" = false ]; then
+  for file in "${files[@]}"; do
+    svc=$(echo "$file" | grep -oE "acmeair-[a-z]+service" | head -1)
+    if [ -z "$service" ] || [ "$service" == "$svc" ]; then
+      if [ -f "$file" ]; then
+        backup_path="$BACKUP_DIR/${svc}_${timestamp}.yaml"
+        cp "$file" "$backup_path"
+        echo "[BACKUP] Saved $svc → $backup_path"
+      fi
     fi
-  fi
-done
+  done
+fi
 
 update_resources() {
   local file=$1
@@ -133,6 +135,13 @@ for file in "${files[@]}"; do
   fi
 
   echo "[UPDATE] Processing $svc..."
+
+  # dry-run edits a scratch copy, the tracked manifest stays untouched
+  if [ "$DRY_RUN" = true ]; then
+    dry_file=$(mktemp "${TMPDIR:-/tmp}/${svc}.XXXXXX")
+    cp "$file" "$dry_file"
+    file="$dry_file"
+  fi
   
   container_name="${svc}-java"
 
@@ -173,16 +182,29 @@ for file in "${files[@]}"; do
     " "$file"
   fi
 
-  sed "${SED_INPLACE[@]}" "0,/kind: Deployment/{
-    /kind: Deployment/,/^---/ {
-      /name: $svc/,/^spec:/ {
-        s/(replicas:[[:space:]]*)[0-9]+/\1${replica}/
-      }
+  # replicas of the service's own Deployment, from its metadata name down to its spec
+  sed "${SED_INPLACE[@]}" "
+    /^  name: $svc\$/,/^  replicas:/ {
+      s/^\(  replicas:[[:space:]]*\)[0-9][0-9]*/\1${replica}/
     }
-  }" "$file"
+  " "$file"
+
+  if [ "$DRY_RUN" = true ]; then
+    echo "[DRY-RUN] Validating $svc ..."
+    if ! oc apply --dry-run=server -f "$file"; then
+      rm -f "$file"
+      echo "[ERROR] Dry-run failed for $svc"
+      exit 1
+    fi
+    rm -f "$file"
+    continue
+  fi
 
   echo "[APPLY] Applying $file ..."
-  oc apply -f "$file"
+  if ! oc apply -f "$file"; then
+    echo "[ERROR] Failed to apply $file"
+    exit 1
+  fi
 done
 
 echo "[SUCCESS] All updates applied successfully."
\ No newline at end of file
@@ -0,0 +1,67 @@
+import argparse
+import time
+
+from mapek.Knowledge import Knowledge
+from mapek.Analyzer import Analyzer
+from mapek.Planner import Planner
+from mapek.Stabilizer import Stabilizer
+from mapek.Simulator import Simulator, load_csv_trace, load_archive_trace
+from mapek.Tenant import build_configs
+from driver import SERVICE_TO_USE, ANALYZE_METRICS
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded metrics through the Analyzer and Planner")
+    parser.add_argument("--csv", help="metrics dataset written by the driver")
+    parser.add_argument("--archive", help="raw archive directory written by the driver")
+    parser.add_argument("--knowledge", default="./mapek/knowledge.json")
+    parser.add_argument("--period", type=int, default=60, help="seconds between recorded cycles")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.csv:
+        trace = load_csv_trace(args.csv, SERVICE_TO_USE)
+    elif args.archive:
+        trace = load_archive_trace(args.archive, args.period)
+    else:
+        parser.error("one of --csv or --archive is required")
+
+    knowledge = Knowledge(args.knowledge)
+    analyzer = Analyzer(ANALYZE_METRICS, SERVICE_TO_USE, knowledge.get_threshold(), knowledge.get_weight(), knowledge.get_analysis())
+    # the utility model learns from the replay alone, the driver's adaptation history stays untouched
+    planning = dict(knowledge.get_planning())
+    if "roi_model" in planning:
+        planning["roi_model"] = {**planning["roi_model"], "history_file": None}
+    planner = Planner(SERVICE_TO_USE, knowledge.get_resource_limitations(), knowledge.get_threshold()["roi"], planning, knowledge.get_threshold(), knowledge.get_dependencies(), knowledge.get_weight())
+    configs = build_configs(knowledge.get_resources(), SERVICE_TO_USE)
+    stabilization = knowledge.get_stabilization()
+    stabilizer = None
+    if stabilization.get("enabled", False):
+        # in memory only, a replay must not touch the driver's persisted state
+        stabilizer = Stabilizer(
+            None,
+            stabilization.get("cooldown", {}).get("up", 120),
+            stabilization.get("cooldown", {}).get("down", 300),
+            stabilization.get("down_window", 300),
+            stabilization.get("history", 6),
+            stabilization.get("max_reversals", 2),
+            stabilization.get("hold", 600)
+        )
+
+    started = time.perf_counter()
+    report = Simulator(analyzer, planner, SERVICE_TO_USE, configs, args.period, args.verbose, stabilizer).run(trace)
+    elapsed = time.perf_counter() - started
+
+    print(f"Replayed {report['cycles']} cycles ({report['cycles'] * args.period}s of trace) in {elapsed:.2f}s")
+    print(f"Analyzed cycles:   {report['analyzed_cycles']}")
+    print(f"Total utility:     {report['total_utility']:.3f}")
+    print(f"SLO violations:    {report['slo_violations']}")
+    print(f"Adaptations:       {report['adaptations']}")
+    print(f"Suppressed:        {report['suppressed']}")
+    print(f"CPU core-seconds:  {report['cpu_core_seconds']:.0f}")
+    print(f"Memory GiB-seconds:{report['memory_gib_seconds']:.0f}")
+    print(f"Replica-seconds:   {report['replica_seconds']:.0f}")
+    for svc, config in report["final_configs"].items():
+        print(f"{svc}: {config}")
+
+if __name__ == "__main__":
+    main()
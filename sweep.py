@@ -0,0 +1,64 @@
+import argparse
+import time
+
+from mapek.Knowledge import Knowledge
+from mapek.Simulator import load_csv_trace
+from mapek.Sweep import build_grid, trace_to_signals, sweep, apply_configuration
+from driver import SERVICE_TO_USE
+
+def values(text):
+    return [float(v) for v in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Score threshold and weight combinations against a recorded trace")
+    parser.add_argument("--csv", default="datasets/metrics_dataset.csv")
+    parser.add_argument("--knowledge", default="./mapek/knowledge.json")
+    parser.add_argument("--cpu-low", type=values, default=values("10,20,30"))
+    parser.add_argument("--cpu-high", type=values, default=values("60,70,80,90"))
+    parser.add_argument("--memory-low", type=values, default=values("20,30,40"))
+    parser.add_argument("--memory-high", type=values, default=values("70,80,90"))
+    parser.add_argument("--latency-avg", type=values, default=values("100,150,200,250"))
+    parser.add_argument("--error-rate", type=values, default=values("0.5,1,2,5"))
+    parser.add_argument("--weight-step", type=float, default=0.1)
+    parser.add_argument("--slo-latency", type=float, help="latency SLO in ms, defaults to the max latency threshold")
+    parser.add_argument("--slo-error-rate", type=float, help="defaults to the error_rate threshold")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--apply", action="store_true", help="write the best configuration back to the knowledge file")
+    args = parser.parse_args()
+
+    knowledge = Knowledge(args.knowledge)
+    thresholds = knowledge.get_threshold()
+    window = knowledge.get_analysis().get("windows", {}).get("cpu", {})
+    slo_latency = args.slo_latency if args.slo_latency is not None else thresholds["latency"]["max"]
+    slo_error_rate = args.slo_error_rate if args.slo_error_rate is not None else thresholds["error_rate"]
+
+    trace = load_csv_trace(args.csv, SERVICE_TO_USE)
+    signals = trace_to_signals(trace, SERVICE_TO_USE, window.get("size", 5), knowledge.get_analysis().get("confidence", 0.8),
+                               thresholds["latency"]["max"])
+    grid = build_grid({
+        "cpu_low": args.cpu_low,
+        "cpu_high": args.cpu_high,
+        "memory_low": args.memory_low,
+        "memory_high": args.memory_high,
+        "latency_avg": args.latency_avg,
+        "error_rate": args.error_rate,
+    }, args.weight_step)
+
+    size = len(grid["cpu_low"])
+    started = time.perf_counter()
+    ranked = sweep(grid, signals, slo_latency, slo_error_rate, args.workers, top=args.top)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {size} configurations on {signals['windowed']['cpu'].size} samples in {elapsed:.2f}s")
+
+    for rank, config in enumerate(ranked, start=1):
+        print(f"#{rank} score={config['score']:.3f} precision={config['precision']:.3f} "
+              f"recall={config['recall']:.3f} alert_rate={config['alert_rate']:.3f}")
+        print(f"    thresholds={config['thresholds']}")
+        print(f"    weights={config['weights']}")
+
+    if args.apply and ranked:
+        apply_configuration(knowledge, ranked[0])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+def make_adaptation(cpu, memory, replica):
+    # a configuration as the Planner emits it, requests at half the limits
+    return {"requests": {"cpu": cpu // 2, "memory": memory // 2}, "limits": {"cpu": cpu, "memory": memory}, "replica": replica}
@@ -0,0 +1,276 @@
+import copy
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from kubernetes import client
+
+from mapek.Actuator import KubernetesActuator
+from mapek.Executor import Executor
+from conftest import make_adaptation
+
+NAMESPACE = "acmeair-test"
+SERVICES = ["acmeair-authservice", "acmeair-flightservice"]
+
+
+def _deployment(svc):
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": svc, "namespace": NAMESPACE, "generation": 1},
+        "spec": {
+            "replicas": 1,
+            "selector": {"matchLabels": {"name": svc}},
+            "template": {"spec": {"containers": [
+                {"name": f"{svc}-java", "image": f"{svc}-java:latest", "resources": {
+                    "requests": {"cpu": "250m", "memory": "256Mi"},
+                    "limits": {"cpu": "500m", "memory": "512Mi"}
+                }},
+                {"name": "sidecar", "image": "sidecar:latest", "resources": {"limits": {"cpu": "100m"}}}
+            ]}}
+        },
+        "status": {"observedGeneration": 1, "replicas": 1, "updatedReplicas": 1, "readyReplicas": 1, "availableReplicas": 1}
+    }
+
+
+def _merge(target, patch):
+    # the strategic-merge rules a Deployment patch needs: maps merge, null deletes, containers merge by name
+    for key, value in patch.items():
+        if key == "containers":
+            by_name = {container["name"]: container for container in target.setdefault(key, [])}
+            for container in value:
+                if container["name"] in by_name:
+                    _merge(by_name[container["name"]], container)
+                else:
+                    target[key].append(container)
+        elif value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+
+
+class DeploymentServer:
+    # stands in for the apps/v1 deployments endpoint of the API server
+    def __init__(self):
+        self.deployments = {svc: _deployment(svc) for svc in SERVICES}
+        self.requests = []
+        self.connections = set()
+        self.reject = set()
+        # status reads a rollout takes before the new pods are ready, none by default
+        self.rollout_polls = {}
+        self.pending = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _route(self):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                # /apis/apps/v1/namespaces/<ns>/deployments/<name>[/status]
+                server.connections.add(self.client_address)
+                if parts[:4] != ["apis", "apps", "v1", "namespaces"] or parts[5] != "deployments":
+                    return None, None, url
+                return parts[4], parts[6], url
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                namespace, name, url = self._route()
+                server.requests.append(("GET", url.path, None, None))
+                if namespace != NAMESPACE or name not in server.deployments:
+                    return self._send(404, {"kind": "Status", "reason": "NotFound", "code": 404})
+                if url.path.endswith("/status"):
+                    server.poll(name)
+                self._send(200, server.deployments[name])
+
+            def do_PATCH(self):
+                namespace, name, url = self._route()
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                dry_run = parse_qs(url.query).get("dryRun") == ["All"]
+                server.requests.append(("PATCH", url.path, self.headers["Content-Type"], {"dry_run": dry_run, "body": body}))
+                if namespace != NAMESPACE or name not in server.deployments:
+                    return self._send(404, {"kind": "Status", "reason": "NotFound", "code": 404})
+                if name in server.reject:
+                    return self._send(422, {"kind": "Status", "reason": "Invalid", "code": 422})
+                deployment = copy.deepcopy(server.deployments[name])
+                _merge(deployment, body)
+                if not dry_run:
+                    deployment["metadata"]["generation"] += 1
+                    server.deployments[name] = deployment
+                    server.start_rollout(name)
+                self._send(200, deployment)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def start_rollout(self, svc):
+        # the controller saw the new spec, the old pods are still serving next to a surge pod
+        deployment = self.deployments[svc]
+        replicas = deployment["spec"]["replicas"]
+        deployment["status"] = {
+            "observedGeneration": deployment["metadata"]["generation"], "replicas": replicas + 1,
+            "updatedReplicas": 0, "readyReplicas": replicas, "availableReplicas": replicas
+        }
+        self.pending[svc] = self.rollout_polls.get(svc, 0)
+        if self.pending[svc] == 0:
+            self._finish_rollout(svc)
+
+    def poll(self, svc):
+        if self.pending.get(svc, 0) > 0:
+            self.pending[svc] -= 1
+            if self.pending[svc] == 0:
+                self._finish_rollout(svc)
+
+    def _finish_rollout(self, svc):
+        replicas = self.deployments[svc]["spec"]["replicas"]
+        self.deployments[svc]["status"].update({
+            "replicas": replicas, "updatedReplicas": replicas, "readyReplicas": replicas, "availableReplicas": replicas
+        })
+
+    def container(self, svc):
+        return self.deployments[svc]["spec"]["template"]["spec"]["containers"][0]
+
+    def adaptable(self, svc):
+        # the part of the spec an adaptation changes
+        return self.deployments[svc]["spec"]["replicas"], self.container(svc)["resources"]
+
+    def patches(self):
+        return [request for request in self.requests if request[0] == "PATCH"]
+
+
+@pytest.fixture
+def server():
+    with DeploymentServer() as server:
+        yield server
+
+
+@pytest.fixture
+def actuator(server):
+    configuration = client.Configuration()
+    configuration.host = f"http://127.0.0.1:{server.httpd.server_port}"
+    return KubernetesActuator(NAMESPACE, client.ApiClient(configuration))
+
+
+def test_apply_sends_strategic_merge_patch(server, actuator):
+    ok, error = actuator.apply("acmeair-authservice", make_adaptation(750, 768, 3), "unhealthy")
+    assert ok, error
+
+    method, path, content_type, request = server.patches()[0]
+    assert path == f"/apis/apps/v1/namespaces/{NAMESPACE}/deployments/acmeair-authservice"
+    assert content_type == "application/strategic-merge-patch+json"
+    assert not request["dry_run"]
+
+    deployment = server.deployments["acmeair-authservice"]
+    assert deployment["spec"]["replicas"] == 3
+    assert server.container("acmeair-authservice")["resources"] == {
+        "requests": {"cpu": "375m", "memory": "384Mi"},
+        "limits": {"cpu": "750m", "memory": "768Mi"}
+    }
+    # only the service's own container is touched
+    assert deployment["spec"]["template"]["spec"]["containers"][1]["resources"] == {"limits": {"cpu": "100m"}}
+
+
+def test_warning_keeps_requests(server, actuator):
+    ok, _ = actuator.apply("acmeair-authservice", make_adaptation(1000, 1024, 2), "warning")
+    assert ok
+    assert server.container("acmeair-authservice")["resources"]["requests"] == {"cpu": "250m", "memory": "256Mi"}
+    assert server.container("acmeair-authservice")["resources"]["limits"] == {"cpu": "1000m", "memory": "1024Mi"}
+
+
+def test_dry_run_leaves_deployment_untouched(server, actuator):
+    before = copy.deepcopy(server.deployments["acmeair-authservice"])
+    ok, _ = actuator.dry_run("acmeair-authservice", make_adaptation(750, 768, 3), "unhealthy")
+    assert ok
+    assert server.patches()[0][3]["dry_run"]
+    assert server.deployments["acmeair-authservice"] == before
+
+
+def test_backup_and_rollback_restore_spec(server, actuator):
+    before = copy.deepcopy(server.adaptable("acmeair-authservice"))
+    snapshot = actuator.backup("acmeair-authservice")
+    actuator.apply("acmeair-authservice", make_adaptation(750, 768, 3), "unhealthy")
+    ok, _ = actuator.rollback("acmeair-authservice", snapshot)
+    assert ok
+    assert server.adaptable("acmeair-authservice") == before
+
+
+@pytest.mark.parametrize("resources", [
+    {"limits": {"cpu": "500m", "memory": "512Mi"}},   # no requests at all
+    {"limits": {"cpu": "500m"}},                      # a memory limit the adaptation adds
+    {}
+])
+def test_rollback_removes_what_apply_added(server, actuator, resources):
+    server.container("acmeair-authservice")["resources"] = copy.deepcopy(resources)
+    snapshot = actuator.backup("acmeair-authservice")
+    actuator.apply("acmeair-authservice", make_adaptation(750, 768, 3), "unhealthy")
+    assert server.container("acmeair-authservice")["resources"]["requests"] == {"cpu": "375m", "memory": "384Mi"}
+
+    ok, _ = actuator.rollback("acmeair-authservice", snapshot)
+    assert ok
+    assert server.container("acmeair-authservice")["resources"] == resources
+    assert server.deployments["acmeair-authservice"]["spec"]["replicas"] == 1
+
+
+def test_rejected_patch_reports_error(server, actuator):
+    server.reject.add("acmeair-authservice")
+    ok, error = actuator.apply("acmeair-authservice", make_adaptation(750, 768, 3), "unhealthy")
+    assert not ok
+    assert error.startswith("422")
+    ok, error = actuator.apply("acmeair-missingservice", make_adaptation(750, 768, 3), "unhealthy")
+    assert not ok
+    assert error.startswith("404")
+
+
+def test_status(server, actuator):
+    status = actuator.status("acmeair-authservice")
+    assert status == {
+        "generation": 1, "observed_generation": 1, "replicas": 1,
+        "total": 1, "updated": 1, "ready": 1, "available": 1
+    }
+    assert server.requests[0][1].endswith("/deployments/acmeair-authservice/status")
+
+
+def test_calls_share_pooled_connection(server, actuator):
+    for _ in range(5):
+        actuator.apply("acmeair-authservice", make_adaptation(750, 768, 2), "warning")
+    assert len(server.requests) == 5
+    assert len(server.connections) == 1
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_executor_rolls_back_through_api(server, actuator, tmp_path, monkeypatch, parallel):
+    monkeypatch.chdir(tmp_path)
+    server.reject.add("acmeair-flightservice")
+    before = {svc: copy.deepcopy(server.adaptable(svc)) for svc in SERVICES}
+    configs = {svc: make_adaptation(500, 512, 1) for svc in SERVICES}
+    plan = {svc: make_adaptation(750, 768, 2) for svc in SERVICES}
+    # the dry-run of the rejected service would already stop the transaction, let it through
+    monkeypatch.setattr(actuator, "dry_run", lambda svc, adaptation, mode: (True, ""))
+
+    executor = Executor(parallel=parallel, actuator=actuator)
+    assert not executor.execute_plan(plan, configs, {svc: "unhealthy" for svc in SERVICES})
+    assert {svc: server.adaptable(svc) for svc in SERVICES} == before
+    # the service that was changed went back through a rollback patch
+    assert server.deployments["acmeair-authservice"]["metadata"]["generation"] == 3
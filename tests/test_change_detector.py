@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+
+from mapek.Analyzer import Analyzer
+from mapek.ChangeDetector import ChangeDetector
+from mapek.Knowledge import Knowledge
+
+SVC = "acmeair-authservice"
+METRICS = [("cpu.quota.used.percent", "avg")]
+
+
+def _noise(n, level=40.0, seed=0):
+    return level + np.random.default_rng(seed).normal(0, 1, n)
+
+
+def _cpu(value):
+    return {("cpu.quota.used.percent", "avg"): {"data": [{"t": 0, "d": [SVC, float(value)]}]}}
+
+
+def _analyzer():
+    knowledge = Knowledge("./mapek/knowledge.json")
+    return Analyzer(METRICS, [SVC], knowledge.get_threshold(), knowledge.get_weight(), knowledge.get_analysis())
+
+
+def test_step_is_flagged_on_its_first_sample():
+    detector = ChangeDetector()
+    assert [detector.update(value) for value in _noise(30)].count(None) == 30
+
+    assert detector.update(90) == "change_up"
+    assert detector.update(91) is None
+    assert detector.pending is None
+    assert detector.regime == [90, 91]
+
+
+def test_one_off_spike_is_taken_back():
+    detector = ChangeDetector()
+    for value in _noise(30):
+        detector.update(value)
+    median = detector.median
+
+    assert detector.update(90) == "change_up"
+    assert detector.update(40) == "outlier"
+    assert abs(detector.median - median) < 1
+    assert detector.pending is None
+
+
+def test_analyzer_reacts_to_a_step_and_ignores_a_spike():
+    analyzer = _analyzer()
+    for value in _noise(30):
+        analyzer.process_data(_cpu(value))
+
+    # the window is reseeded at the new level right away
+    analyzer.process_data(_cpu(90))
+    assert analyzer.service_stats[SVC]["cpu"].mean() == 90
+    # the spike is gone from the window once the next sample is back at the old level
+    analyzer.process_data(_cpu(40))
+    assert max(analyzer.service_stats[SVC]["cpu"].values) < 45
+
+
+def test_checkpoint_keeps_a_tentative_change():
+    analyzer = _analyzer()
+    for value in _noise(30):
+        analyzer.process_data(_cpu(value))
+    analyzer.process_data(_cpu(90))
+
+    restored = _analyzer()
+    restored.restore(json.loads(json.dumps(analyzer.checkpoint())))
+    assert restored.detectors[SVC]["cpu"].state() == analyzer.detectors[SVC]["cpu"].state()
+
+    # both take the spike back the same way
+    analyzer.process_data(_cpu(40))
+    restored.process_data(_cpu(40))
+    assert list(restored.service_stats[SVC]["cpu"].values) == list(analyzer.service_stats[SVC]["cpu"].values)
+    assert restored.pending_stats[SVC] == {}
@@ -0,0 +1,156 @@
+import os
+import re
+import shutil
+import time
+
+import pytest
+
+from mapek.Executor import Executor
+from conftest import make_adaptation
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# stands in for `oc`: keeps a copy of every applied manifest, sleeps FAKE_OC_SLEEP
+# and fails when "<phase>:<manifest>" contains FAKE_OC_FAIL
+FAKE_OC = """#!/bin/bash
+phase=apply
+file=""
+while [[ $# -gt 0 ]]; do
+  case "$1" in
+    get) phase=get ;;
+    --dry-run=*) phase=dry-run ;;
+    -f) file="$2"; shift ;;
+  esac
+  shift
+done
+sleep "${FAKE_OC_SLEEP:-0}"
+if [ "$phase" = get ]; then
+  echo "kind: Deployment"
+  exit 0
+fi
+name=$(basename "$file")
+echo "$phase $name" >> "$FAKE_OC_DIR/calls.log"
+cp "$file" "$FAKE_OC_DIR/$phase-$name"
+if [ -n "$FAKE_OC_FAIL" ] && [[ "$phase:$name" == *"$FAKE_OC_FAIL"* ]]; then
+  echo "fake oc: refusing $name" >&2
+  exit 1
+fi
+"""
+
+CONFIGS = {
+    svc: {"requests": {"cpu": 250, "memory": 256}, "limits": {"cpu": 500, "memory": 512}, "replica": 1}
+    for svc in ["acmeair-authservice", "acmeair-flightservice", "acmeair-bookingservice"]
+}
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    # config.sh edits the manifests next to it, so it runs on a copy
+    shutil.copytree(os.path.join(REPO, "mapek", "microservices"), tmp_path / "mapek" / "microservices")
+    shutil.copy(os.path.join(REPO, "mapek", "config.sh"), tmp_path / "mapek" / "config.sh")
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "oc").write_text(FAKE_OC)
+    (bin_dir / "oc").chmod(0o755)
+    # config.sh is a bash script, `sh` is bash on the hosts the driver runs from
+    os.symlink(shutil.which("bash"), bin_dir / "sh")
+
+    calls = tmp_path / "calls"
+    calls.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_OC_DIR", str(calls))
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    return calls
+
+
+def _calls(calls):
+    path = calls / "calls.log"
+    return path.read_text().split("\n")[:-1] if path.exists() else []
+
+
+def _manifest_values(path):
+    text = path.read_text()
+    return re.findall(r'cpu: "([^"]*)"', text)[:2], re.findall(r'memory: "([^"]*)"', text)[:2], re.findall(r"replicas: (\d+)", text)[0]
+
+
+def test_dry_run_validates_target_values(workspace):
+    plan = {"acmeair-authservice": make_adaptation(750, 768, 3)}
+    assert Executor().execute_plan(plan, CONFIGS, {"acmeair-authservice": "unhealthy"})
+
+    dry_runs = [call for call in _calls(workspace) if call.startswith("dry-run ")]
+    assert len(dry_runs) == 1
+    cpu, memory, replicas = _manifest_values(workspace / f"dry-run-{dry_runs[0].split()[1]}")
+    assert cpu == ["375m", "750m"]
+    assert memory == ["384Mi", "768Mi"]
+    assert replicas == "3"
+
+    # the applied manifest carries the same values, the dry-run left no scratch copy behind
+    assert _manifest_values(workspace / "apply-deploy-acmeair-authservice-java.yaml") == (cpu, memory, replicas)
+    assert not [name for name in os.listdir(".") if name.startswith("acmeair-authservice.")]
+
+
+def test_warning_dry_run_keeps_requests(workspace):
+    plan = {"acmeair-flightservice": make_adaptation(1000, 1024, 2)}
+    assert Executor().execute_plan(plan, CONFIGS, {"acmeair-flightservice": "warning"})
+
+    dry_run = next(call for call in _calls(workspace) if call.startswith("dry-run "))
+    cpu, memory, replicas = _manifest_values(workspace / f"dry-run-{dry_run.split()[1]}")
+    assert cpu == ["250m", "1000m"]
+    assert memory == ["256Mi", "1024Mi"]
+    assert replicas == "2"
+
+
+def test_parallel_overlaps_services(workspace, monkeypatch):
+    monkeypatch.setenv("FAKE_OC_SLEEP", "0.5")
+    plan = {svc: make_adaptation(750, 768, 2) for svc in CONFIGS}
+    situations = {svc: "unhealthy" for svc in CONFIGS}
+
+    started = time.time()
+    assert Executor(parallel=True).execute_plan(plan, CONFIGS, situations)
+    parallel = time.time() - started
+    # dry-run, backup and apply of three services, 9 sleeps one after another
+    assert parallel < 9 * 0.5
+    assert sorted(call for call in _calls(workspace) if call.startswith("apply ")) == [
+        f"apply deploy-{svc}-java.yaml" for svc in sorted(CONFIGS)
+    ]
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_failed_dry_run_applies_nothing(workspace, monkeypatch, parallel):
+    monkeypatch.setenv("FAKE_OC_FAIL", "dry-run:acmeair-flightservice")
+    plan = {svc: make_adaptation(750, 768, 2) for svc in CONFIGS}
+    situations = {svc: "unhealthy" for svc in CONFIGS}
+
+    assert not Executor(parallel=parallel).execute_plan(plan, CONFIGS, situations)
+    assert not [call for call in _calls(workspace) if call.startswith("apply ")]
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_failed_apply_rolls_back(workspace, monkeypatch, parallel):
+    monkeypatch.setenv("FAKE_OC_FAIL", "apply:deploy-acmeair-flightservice")
+    plan = {svc: make_adaptation(750, 768, 2) for svc in CONFIGS}
+    situations = {svc: "unhealthy" for svc in CONFIGS}
+
+    assert not Executor(parallel=parallel).execute_plan(plan, CONFIGS, situations)
+    # every backed-up service is applied again from its backup
+    rollbacks = [call.split()[1] for call in _calls(workspace) if call.startswith("apply acmeair-")]
+    if parallel:
+        assert sorted(name.rsplit("_", 2)[0] for name in rollbacks) == sorted(CONFIGS)
+    else:
+        # the sequential transaction stops at the failing service, the ones before it are reverted
+        assert rollbacks and all(name.startswith(("acmeair-authservice_", "acmeair-flightservice_")) for name in rollbacks)
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_expired_budget_applies_nothing(workspace, parallel):
+    plan = {svc: make_adaptation(750, 768, 2) for svc in CONFIGS}
+    situations = {svc: "unhealthy" for svc in CONFIGS}
+
+    assert not Executor(parallel=parallel).execute_plan(plan, CONFIGS, situations, lambda: True)
+    calls = _calls(workspace)
+    assert len([call for call in calls if call.startswith("dry-run ")]) == len(CONFIGS)
+    # no backup taken, no manifest applied
+    assert not os.listdir("backup")
+    assert not [call for call in calls if call.startswith("apply ")]
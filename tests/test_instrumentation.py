@@ -0,0 +1,33 @@
+import json
+
+from mapek.Instrumentation import Instrumentation
+
+
+class FakeMonitor:
+    def fetch_data_from_ibm(self, id, aggregation):
+        return {"data": []}
+
+    def fetch_batch_from_ibm(self, metrics):
+        return None
+
+    def collect(self, metrics):
+        return [self.fetch_data_from_ibm(id, aggregation) for id, aggregation in metrics]
+
+
+def test_cycle_totals_only_count_the_outer_stages(tmp_path):
+    log_file = tmp_path / "driver_metrics.jsonl"
+    instrumentation = Instrumentation(str(log_file))
+    monitor = FakeMonitor()
+    instrumentation.wrap(monitor, "fetch_data_from_ibm", labels={"stage": "monitor_fetch"})
+    instrumentation.wrap(monitor, "collect", labels={"stage": "monitor"})
+
+    started = instrumentation.begin_cycle()
+    monitor.collect([("cpu", "avg"), ("memory", "avg")])
+    instrumentation.end_cycle(1, started, False)
+
+    with open(log_file) as f:
+        record = json.loads(f.readline())
+    # the fetches are inside the monitor stage, counting them too would double its time
+    assert set(record["stages"]) == {"monitor"}
+    fetches = instrumentation.histograms[("mapek_stage_duration_seconds", (("stage", "monitor_fetch"),))]
+    assert fetches.count == 2
@@ -0,0 +1,20 @@
+import json
+import shutil
+import subprocess
+import sys
+
+
+def test_pending_write_is_flushed_at_exit(tmp_path):
+    knowledge_file = tmp_path / "knowledge.json"
+    shutil.copy("./mapek/knowledge.json", knowledge_file)
+
+    # the coalesced write is still waiting on its timer when the interpreter exits
+    subprocess.run([
+        sys.executable, "-c",
+        "import sys; from mapek.Knowledge import Knowledge; "
+        "Knowledge(sys.argv[1], write_delay=60).set_weight('cpu', 0.4)",
+        str(knowledge_file)
+    ], check=True)
+
+    with open(knowledge_file) as f:
+        assert json.load(f)["weights"]["cpu"] == 0.4
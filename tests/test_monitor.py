@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+import mapek.Monitor as monitor_module
+from mapek.Monitor import Monitor
+
+SERVICES = ["acmeair-authservice", "acmeair-flightservice"]
+METRICS = [
+    ("jvm.heap.used.percent", "avg"), ("jvm.gc.global.time", "avg"), ("jvm.nonHeap.used.percent", "avg"),
+    ("cpu.quota.used.percent", "avg"), ("memory.limit.used.percent", "avg"), ("net.request.time.in", "avg"),
+    ("jvm.thread.count", "max"), ("net.http.request.time", "max"), ("net.request.time.in", "max"),
+    ("net.bytes.in", "max"), ("net.bytes.out", "max"), ("net.bytes.total", "max"),
+    ("kubernetes.deployment.replicas.available", "max"),
+    ("jvm.gc.global.count", "sum"), ("net.request.count.in", "sum"), ("net.http.error.count", "sum"),
+    ("net.bytes.total", "sum"),
+]
+
+
+class StubSysdig:
+    # replaces SdMonitorClient.get_data: sleeps like a network round trip and counts requests in flight
+    def __init__(self, delay=0.2, failing=(), raising=(), slow=None):
+        self.delay = delay
+        # metric id -> round trip of requests containing it
+        self.slow = slow or {}
+        self.failing = set(failing)
+        self.raising = set(raising)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    def get_data(self, metrics, start_ts, end_ts, sampling_s, filter):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(max([self.delay] + [self.slow.get(metric["id"], 0) for metric in metrics]))
+            metric_id = metrics[-1]["id"]
+            if metric_id in self.raising:
+                raise ConnectionError("connection reset")
+            if metric_id in self.failing:
+                return False, "403 Forbidden"
+            values = len(metrics) - 1
+            data = [{"t": start_ts + t, "d": [svc] + [float(i)] * values} for t in (0, 10) for i, svc in enumerate(SERVICES)]
+            return True, {"data": data, "start": start_ts, "end": end_ts}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def make_monitor(tmp_path, monkeypatch):
+    # raw responses are written under datasets/, keep them out of the repository
+    monkeypatch.chdir(tmp_path)
+
+    def make(stub, max_workers=4, mode="concurrent", batch_size=20, archive=None):
+        monkeypatch.setattr(monitor_module.IbmAuthHelper, "get_headers", staticmethod(lambda *args: {}))
+        monkeypatch.setattr(monitor_module.SdMonitorClient, "get_data", lambda self, **kwargs: stub.get_data(**kwargs))
+        return Monitor("https://sysdig.invalid", "key", "guid", 60, max_workers, mode, batch_size, archive)
+    return make
+
+
+def test_fetch_all_runs_requests_concurrently(make_monitor):
+    stub = StubSysdig()
+    monitor = make_monitor(stub)
+
+    started = time.perf_counter()
+    data_dict = monitor.fetch_all(METRICS)
+    elapsed = time.perf_counter() - started
+
+    assert stub.calls == len(METRICS)
+    # bounded by max_workers, and far from one round trip after the other
+    assert stub.max_in_flight == 4
+    assert elapsed < len(METRICS) * stub.delay / 2
+    # same keys and order as the requested metrics
+    assert list(data_dict) == METRICS
+    assert data_dict[METRICS[0]]["data"][1]["d"] == ["acmeair-flightservice", 1.0]
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_concurrency_limit(make_monitor, max_workers):
+    stub = StubSysdig(delay=0.05)
+    monitor = make_monitor(stub, max_workers)
+    monitor.fetch_all(METRICS[:6])
+    assert stub.max_in_flight == max_workers
+
+
+def test_failed_metrics_are_reported_and_skipped(make_monitor, capsys):
+    stub = StubSysdig(delay=0.01, failing=["cpu.quota.used.percent"], raising=["net.request.time.in"])
+    monitor = make_monitor(stub)
+    data_dict = monitor.fetch_all(METRICS)
+
+    output = capsys.readouterr().out
+    assert "Error fetching cpu.quota.used.percent: 403 Forbidden" in output
+    assert "Exception occurred while fetching net.request.time.in: connection reset" in output
+    assert "Failed to fetch cpu.quota.used.percent with avg aggregation" in output
+    failed = {key for key in METRICS if key[0] in ("cpu.quota.used.percent", "net.request.time.in")}
+    assert set(data_dict) == set(METRICS) - failed
+
+
+class ListArchive:
+    # in memory, the abandoned request still saves its response after the test has left tmp_path
+    def __init__(self):
+        self.saved = []
+
+    def append(self, id, aggregation, res):
+        self.saved.append((id, aggregation))
+
+
+@pytest.mark.parametrize("mode", ["concurrent", "batch"])
+def test_collect_returns_within_timeout(make_monitor, capsys, mode):
+    stub = StubSysdig(delay=0.01, slow={"net.bytes.in": 2.0})
+    monitor = make_monitor(stub, mode=mode, batch_size=6, archive=ListArchive())
+
+    started = time.perf_counter()
+    data_dict = monitor.collect(METRICS, timeout=0.5)
+    elapsed = time.perf_counter() - started
+
+    # the slow request is abandoned, everything that arrived in time is kept
+    assert elapsed < 1.0
+    assert ("net.bytes.in", "max") not in data_dict
+    assert ("cpu.quota.used.percent", "avg") in data_dict
+    assert "Timed out fetching" in capsys.readouterr().out
@@ -0,0 +1,39 @@
+import copy
+
+from mapek.Knowledge import Knowledge
+from mapek.Planner import Planner
+
+SVC = "acmeair-authservice"
+CONFIG = {"requests": {"cpu": 500, "memory": 256}, "limits": {"cpu": 500, "memory": 512}, "replica": 1}
+
+
+def _planner():
+    knowledge = Knowledge("./mapek/knowledge.json")
+    planning = {"steps": {"policy": "proportional", "cooldown": 2}}
+    return Planner([SVC], knowledge.get_resource_limitations(), 0.0, planning, knowledge.get_threshold())
+
+
+def _saturated():
+    return {
+        SVC: {
+            "service": SVC, "adaptation": "unhealthy", "overall_utility": 0.3,
+            "unhealthy_metrics": {"cpu_high", "latency_avg_high"},
+            "cpu": 95, "memory": 50, "latency_avg": 300, "error_rate": 0, "request_per_second": 50, "replicas": 1
+        }
+    }
+
+
+def test_cooldown_starts_when_the_plan_is_committed():
+    planner = _planner()
+    decisions, _, _ = planner.evaluate_services(_saturated(), {SVC: copy.deepcopy(CONFIG)})
+    assert decisions[SVC]["limits"]["cpu"] > CONFIG["limits"]["cpu"]
+
+    # not applied, e.g. the Executor failed: the next cycle may size the change again
+    decisions, _, _ = planner.evaluate_services(_saturated(), {SVC: copy.deepcopy(CONFIG)})
+    assert decisions[SVC]["limits"]["cpu"] > CONFIG["limits"]["cpu"]
+
+    planner.commit(decisions, {SVC: CONFIG})
+    applied = decisions[SVC]
+    decisions, _, _ = planner.evaluate_services(_saturated(), {SVC: copy.deepcopy(applied)})
+    # the CPU limit just moved, only the replica count may change
+    assert not decisions[SVC] or decisions[SVC]["limits"]["cpu"] == applied["limits"]["cpu"]
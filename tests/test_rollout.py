@@ -0,0 +1,130 @@
+import json
+import threading
+
+import pytest
+from kubernetes import client
+
+from mapek.Actuator import KubernetesActuator
+from mapek.Analyzer import Analyzer
+from mapek.Knowledge import Knowledge
+from mapek.Rollout import RolloutTracker
+from conftest import make_adaptation
+from test_actuator import DeploymentServer, NAMESPACE
+
+SVC = "acmeair-authservice"
+
+
+class FakeClock:
+    # the tracker polls on this clock, a sleep moves it forward instead of blocking
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def server():
+    with DeploymentServer() as server:
+        yield server
+
+
+@pytest.fixture
+def actuator(server):
+    configuration = client.Configuration()
+    configuration.host = f"http://127.0.0.1:{server.httpd.server_port}"
+    return KubernetesActuator(NAMESPACE, client.ApiClient(configuration))
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def tracker(actuator, clock, tmp_path):
+    return RolloutTracker(actuator, 120, 60, 5, str(tmp_path / "rollouts.jsonl"), clock=clock, sleep=clock.sleep)
+
+
+def _settle(tracker, svc):
+    # wait for the polling thread to decide on the rollout and write its log record
+    for thread in threading.enumerate():
+        if thread.name == f"rollout-{svc}":
+            thread.join(5)
+    assert tracker.rollouts[svc]["warm_until"] is not None
+    return tracker.rollouts[svc]
+
+
+def _log(tmp_path):
+    with open(tmp_path / "rollouts.jsonl") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_time_to_ready_and_warmup_expiry(server, actuator, tracker, clock, tmp_path):
+    server.rollout_polls[SVC] = 3
+    ok, error = actuator.apply(SVC, make_adaptation(750, 768, 2), "unhealthy")
+    assert ok, error
+
+    tracker.track(SVC)
+    assert SVC in tracker.warming()
+    rollout = _settle(tracker, SVC)
+
+    # not ready on the first two polls, ready on the third one poll_interval later
+    assert rollout["ready"] - rollout["started"] == 10
+    assert _log(tmp_path) == [{
+        "service": SVC, "started": 1000.0, "ready": 1010.0, "time_to_ready": 10.0, "timed_out": False
+    }]
+
+    clock.now = rollout["ready"] + 119
+    assert tracker.warming() == {SVC}
+    clock.now = rollout["ready"] + 120
+    assert tracker.warming() == set()
+
+
+def test_rollout_that_never_gets_ready_times_out(server, actuator, tracker, clock, tmp_path):
+    server.rollout_polls[SVC] = 100
+    actuator.apply(SVC, make_adaptation(750, 768, 2), "unhealthy")
+
+    tracker.track(SVC)
+    rollout = _settle(tracker, SVC)
+
+    assert rollout["ready"] is None
+    assert rollout["warm_until"] == 1060 + 120
+    assert _log(tmp_path)[0]["timed_out"]
+
+
+def test_warming_samples_are_masked(server, actuator, tracker, clock):
+    knowledge = Knowledge("./mapek/knowledge.json")
+    analyzer = Analyzer([("cpu.quota.used.percent", "avg")], [SVC], knowledge.get_threshold(), knowledge.get_weight())
+    data_dict = {("cpu.quota.used.percent", "avg"): {"data": [{"t": 0, "d": [SVC, 50.0]}]}}
+    window = analyzer.service_stats[SVC]["cpu"]
+
+    actuator.apply(SVC, make_adaptation(750, 768, 2), "unhealthy")
+    tracker.track(SVC)
+    rollout = _settle(tracker, SVC)
+
+    analyzer.set_warming(tracker.warming())
+    analyzer.process_data(data_dict)
+    # the raw observation is still there for the Planner, the window is left alone
+    assert analyzer.observations[SVC]["warming"]
+    assert len(window) == 0
+
+    clock.now = rollout["warm_until"]
+    analyzer.set_warming(tracker.warming())
+    analyzer.process_data(data_dict)
+    assert not analyzer.observations[SVC]["warming"]
+    assert len(window) == 1
+
+
+@pytest.mark.parametrize("adaptation, warmup", [
+    (make_adaptation(500, 512, 1), False),   # replica-only scale-down, no new ReplicaSet
+    (make_adaptation(500, 512, 3), True),    # new pods have to warm up
+    (make_adaptation(750, 512, 1), True),    # new pod template
+])
+def test_needs_warmup(tracker, adaptation, warmup):
+    assert tracker.needs_warmup(make_adaptation(500, 512, 2), adaptation) == warmup
+    # a service without a known configuration is always followed
+    assert tracker.needs_warmup(None, adaptation)
@@ -0,0 +1,76 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from mapek.Knowledge import Knowledge
+from mapek.UtilityModel import UtilityModel
+
+CONFIG = {"requests": {"cpu": 250, "memory": 256}, "limits": {"cpu": 500, "memory": 512}, "replica": 1}
+SCALED_OUT = {**CONFIG, "replica": 2}
+
+
+def _result(cpu, rps=None):
+    # M/M/1 service: 40 ms at idle, growing as 1 / (1 - u)
+    u = min(cpu / 100, 0.95)
+    return {"cpu": cpu, "memory": 55, "latency_avg": 40 / (1 - u), "error_rate": 0, "request_per_second": rps or cpu}
+
+
+@pytest.fixture
+def make_model():
+    knowledge = Knowledge("./mapek/knowledge.json")
+
+    def make(history_file=None, flush_interval=300):
+        return UtilityModel(knowledge.get_threshold(), knowledge.get_weight(), 0.995, 60, history_file, flush_interval)
+    return make
+
+
+def _train(model, cycles=80):
+    # load sweeps up and down on one replica, no adaptation was ever made
+    for i in range(cycles):
+        cpu, post_cpu = 50 + 45 * np.sin(i / 5), 50 + 45 * np.sin((i + 1) / 5)
+        model.update(_result(cpu), CONFIG, CONFIG, _result(post_cpu))
+
+
+def test_learns_scale_out_from_load_alone(make_model):
+    model = make_model()
+    _train(model, 59)
+    assert not model.ready
+    _train(model, 1)
+    assert model.ready
+
+    # a saturated service is relieved by a second replica even though no replica change was ever seen
+    assert model.benefit(_result(90), CONFIG, SCALED_OUT) > 0.3
+    # an idle one only loses efficiency
+    assert model.benefit(_result(10), CONFIG, SCALED_OUT) < 0
+    # and gives its replica back at almost no cost
+    assert model.benefit(_result(5), SCALED_OUT, CONFIG) > -0.01
+
+
+def test_history_is_buffered_and_replayed(make_model, tmp_path):
+    history_file = str(tmp_path / "adaptations.jsonl")
+    model = make_model(history_file)
+    _train(model)
+    # nothing written before the flush interval has passed
+    assert not os.path.exists(history_file)
+
+    model.close()
+    with open(history_file) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 80
+    assert set(records[0]["post_result"]) == {"cpu", "memory", "latency_avg", "error_rate", "request_per_second"}
+
+    restarted = make_model(history_file)
+    assert restarted.samples == 80
+    assert np.allclose(restarted.weights, model.weights)
+
+
+def test_history_flushes_once_the_interval_passed(make_model, tmp_path):
+    history_file = str(tmp_path / "adaptations.jsonl")
+    model = make_model(history_file, flush_interval=0)
+    _train(model, 3)
+    with open(history_file) as f:
+        assert len(f.readlines()) == 3
+    assert model.records == []
+    model.close()
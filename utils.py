@@ -1,99 +1,161 @@
+import os
 import csv
+import json
+import time
+from datetime import datetime
 
-import pandas as pd
+import numpy as np
+
+from mapek.Aggregator import Aggregator
+
+HEADERS = [
+    'timestamp',
+    'service',
+    'cpu.quota.used.percent',
+    'memory.limit.used.percent',
+    'jvm.heap.used.percent',
+    'jvm.gc.global.time',
+    'kubernetes.deployment.replicas.available',
+    'net.http.request.time',
+    'net.request.count.in',
+    'net.http.error.count',
+    'net.request.time.in',
+    'net.bytes.in',
+    'net.bytes.out',
+    'net.bytes.total',
+    'jvm.nonHeap.used.percent',
+    'jvm.thread.count',
+    'jvm.gc.global.count'
+]
+
+METRIC_MAP = {
+    ("cpu.quota.used.percent", "avg"): "cpu.quota.used.percent",
+    ("memory.limit.used.percent", "avg"): "memory.limit.used.percent",
+    ("jvm.heap.used.percent", "avg"): "jvm.heap.used.percent",
+    ("jvm.gc.global.time", "avg"): "jvm.gc.global.time",
+    ("kubernetes.deployment.replicas.available", "max"): "kubernetes.deployment.replicas.available",
+    ("net.http.request.time", "max"): "net.http.request.time",
+    ("net.request.count.in", "sum"): "net.request.count.in",
+    ("net.http.error.count", "sum"): "net.http.error.count",
+    ("net.request.time.in", "max"): "net.request.time.in",
+    ("net.bytes.in", "max"): "net.bytes.in",
+    ("net.bytes.out", "max"): "net.bytes.out",
+    ("net.bytes.total", "max"): "net.bytes.total",
+    ("jvm.nonHeap.used.percent", "avg"): "jvm.nonHeap.used.percent",
+    ("jvm.thread.count", "max"): "jvm.thread.count",
+    ("jvm.gc.global.count", "sum"): "jvm.gc.global.count"
+}
 
 # Initialize CSV file with headers
 def init_csv(csv_file):
-    headers = [
-        'timestamp', 
-        'service', 
-        'cpu.quota.used.percent', 
-        'memory.limit.used.percent', 
-        'jvm.heap.used.percent',
-        'jvm.gc.global.time', 
-        'kubernetes.deployment.replicas.available', 
-        'net.http.request.time', 
-        'net.request.count.in', 
-        'net.http.error.count',
-        'net.request.time.in',
-        'net.bytes.in',
-        'net.bytes.out',
-        'net.bytes.total',
-        'jvm.nonHeap.used.percent',
-        'jvm.thread.count',
-        'jvm.gc.global.count'
-    ]
     with open(csv_file, 'w', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(headers)
-
-def append_to_csv(csv_file, timestamp, data_dict, service_to_use):
-    metric_map = {
-        ("cpu.quota.used.percent", "avg"): "cpu.quota.used.percent",
-        ("memory.limit.used.percent", "avg"): "memory.limit.used.percent",
-        ("jvm.heap.used.percent", "avg"): "jvm.heap.used.percent",
-        ("jvm.gc.global.time", "avg"): "jvm.gc.global.time",
-        ("kubernetes.deployment.replicas.available", "max"): "kubernetes.deployment.replicas.available",
-        ("net.http.request.time", "max"): "net.http.request.time",
-        ("net.request.count.in", "sum"): "net.request.count.in",
-        ("net.http.error.count", "sum"): "net.http.error.count",
-        ("net.request.time.in", "max"): "net.request.time.in",
-        ("net.bytes.in", "max"): "net.bytes.in",
-        ("net.bytes.out", "max"): "net.bytes.out",
-        ("net.bytes.total", "max"): "net.bytes.total",
-        ("jvm.nonHeap.used.percent", "avg"): "jvm.nonHeap.used.percent",
-        ("jvm.thread.count", "max"): "jvm.thread.count",
-        ("jvm.gc.global.count", "sum"): "jvm.gc.global.count"
-    }
-
-    service_data = {svc: {col: None for col in metric_map.values()} for svc in service_to_use}
-
-    for (metric_id, agg), res in data_dict.items():
-        if (metric_id, agg) not in metric_map:
-            continue
-            
+        writer.writerow(HEADERS)
+
+def build_rows(timestamp, data_dict, service_to_use, aggregated=None):
+    service_data = {svc: {col: None for col in METRIC_MAP.values()} for svc in service_to_use}
+
+    if aggregated is None:
         try:
-            header = metric_map[(metric_id, agg)]
-            df = pd.DataFrame([{
-                "timestamp": e['t'], "service": e['d'][0], "value": e['d'][1]
-            } for e in res["data"]])
-            
-            df_filtered = df[df['service'].isin(service_to_use)]
-            
-            if not df_filtered.empty:
-                avg_values = df_filtered.groupby("service")["value"].mean()
-                
-                for svc, val in avg_values.items():
-                    if svc in service_to_use:
-                        service_data[svc][header] = val
+            aggregated = Aggregator(service_to_use).aggregate(data_dict)
         except Exception as e:
-            print(f"Error processing metric {metric_id} with aggregation {agg}: {e}")
-            continue
+            print(f"Error processing metrics: {e}")
+            aggregated = {}
 
+    for svc in service_to_use:
+        for (metric_id, agg), val in aggregated.get(svc, {}).items():
+            if (metric_id, agg) in METRIC_MAP:
+                service_data[svc][METRIC_MAP[(metric_id, agg)]] = val
+
+    return [[timestamp, svc] + [service_data[svc].get(col) for col in HEADERS[2:]] for svc in service_to_use]
+
+def append_to_csv(csv_file, timestamp, data_dict, service_to_use, aggregated=None):
+    rows = build_rows(timestamp, data_dict, service_to_use, aggregated)
     try:
         with open(csv_file, "a", newline='') as f:
             writer = csv.writer(f)
-            for svc in service_to_use:
-                row = [
-                    timestamp,
-                    svc,
-                    service_data[svc].get("cpu.quota.used.percent"),
-                    service_data[svc].get("memory.limit.used.percent"),
-                    service_data[svc].get("jvm.heap.used.percent"),
-                    service_data[svc].get("jvm.gc.global.time"),
-                    service_data[svc].get("kubernetes.deployment.replicas.available"),
-                    service_data[svc].get("net.http.request.time"),
-                    service_data[svc].get("net.request.count.in"),
-                    service_data[svc].get("net.http.error.count"),
-                    service_data[svc].get("net.request.time.in"),
-                    service_data[svc].get("net.bytes.in"),
-                    service_data[svc].get("net.bytes.out"),
-                    service_data[svc].get("net.bytes.total"),
-                    service_data[svc].get("jvm.nonHeap.used.percent"),
-                    service_data[svc].get("jvm.thread.count"),
-                    service_data[svc].get("jvm.gc.global.count"),
-                ]
-                writer.writerow(row)
+            writer.writerows(rows)
         print(f"Data for timestamp {timestamp} appended to CSV successfully")
     except Exception as e:
-        print(f"Error writing to CSV: {e}")
\ No newline at end of file
+        print(f"Error writing to CSV: {e}")
+
+def load_binary_dataset(bin_file):
+    # rows of [epoch timestamp, service index, metrics...] written by DatasetWriter
+    with open(bin_file + ".json", "r") as f:
+        meta = json.load(f)
+    values = np.fromfile(bin_file, dtype=np.float64)
+    return values.reshape(-1, len(meta["columns"])), meta
+
+class DatasetWriter:
+    def __init__(self, csv_file, service_to_use, flush_interval=300, binary=False):
+        self.csv_file = csv_file
+        self.services = service_to_use
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.last_flush = time.time()
+
+        # resume an existing dataset, a file with another layout is moved aside
+        if os.path.exists(csv_file) and os.path.getsize(csv_file) > 0:
+            with open(csv_file, "r", newline='') as f:
+                header = next(csv.reader(f), None)
+            if header != HEADERS:
+                backup = f"{csv_file}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.bak"
+                os.replace(csv_file, backup)
+                print(f"Dataset header changed, previous file moved to {backup}")
+        new_file = not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0
+        self.file = open(csv_file, "a", newline='')
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(HEADERS)
+            self.file.flush()
+
+        # optional compact sink: float64 rows appended next to the CSV
+        self.binary_file = None
+        if binary:
+            bin_file = os.path.splitext(csv_file)[0] + ".bin"
+            meta = {"columns": ["timestamp", "service"] + HEADERS[2:], "services": list(service_to_use)}
+            if os.path.exists(bin_file + ".json"):
+                with open(bin_file + ".json", "r") as f:
+                    if json.load(f) != meta and os.path.exists(bin_file):
+                        os.replace(bin_file, f"{bin_file}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.bak")
+            with open(bin_file + ".json", "w") as f:
+                json.dump(meta, f)
+            self.binary_file = open(bin_file, "ab")
+
+    def append(self, timestamp, data_dict, aggregated=None):
+        self.rows.extend(build_rows(timestamp, data_dict, self.services, aggregated))
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        try:
+            self.writer.writerows(self.rows)
+            self.file.flush()
+            if self.binary_file is not None:
+                self.binary_file.write(self._to_binary(self.rows).tobytes())
+                self.binary_file.flush()
+            print(f"{len(self.rows)} rows flushed to {self.csv_file}")
+        except Exception as e:
+            print(f"Error writing to CSV: {e}")
+        self.rows = []
+        self.last_flush = time.time()
+
+    def _to_binary(self, rows):
+        service_index = {svc: idx for idx, svc in enumerate(self.services)}
+        values = np.full((len(rows), len(HEADERS)), np.nan, dtype=np.float64)
+        for i, row in enumerate(rows):
+            timestamp = row[0]
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp).timestamp()
+            values[i, 0] = timestamp
+            values[i, 1] = service_index[row[1]]
+            values[i, 2:] = [np.nan if v is None else v for v in row[2:]]
+        return values
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        if self.binary_file is not None:
+            self.binary_file.close()